@@ -0,0 +1,179 @@
+# ============================================================
+#               ELURA UTILITY • HANDLER BENCHMARKS
+# ============================================================
+# Drives the real command handlers from main.py with fake gateway objects
+# against synthetic alliances.json files, fully offline.
+#
+#   python benchmarks/bench_handlers.py                       # 1k, 100k, 1M
+#   python benchmarks/bench_handlers.py --sizes 1000 --ops 5000
+#   python benchmarks/bench_handlers.py --json > bench.json
+#
+# Each size runs in its own process and temp directory (main.py loads its
+# data at import). "size" is both the number of economy users and cases.
+# Reported per scenario: ops/sec, p50/p99 latency and bytes written to disk
+# per operation (log appends + snapshots, after a final flush). The
+# translate scenario uses the offline stub provider; cooldowns are set to 0
+# so every work and rob call takes the write path.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+from fakes import (COUNT_CHANNEL_ID, GUILD_ID, FakeChannel, FakeGuild,
+                   FakeInteraction, FakeMessage, write_alliances)
+
+SCENARIOS = ("work", "rob", "leaderboard", "warnings", "counting", "translate")
+WARMUP = 20
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# ------------------------------
+# Child: one size, one process
+# ------------------------------
+def run_child(size, ops, seed):
+    write_alliances("data/alliances.json", size, size, seed)
+
+    sys.path.insert(0, REPO_ROOT)
+    os.environ["ELURA_TRANSLATOR"] = "stub"   # never touch the network
+    start = time.perf_counter()
+    import main
+    main.open_storage()
+    load_seconds = time.perf_counter() - start
+
+    async def no_commands(message):
+        pass
+    main.bot.process_commands = no_commands
+    main.COOLDOWNS = {"work": 0, "rob": 0}   # measure the write path, not the cooldown rejection
+
+    rng = random.Random(seed)
+    guild = FakeGuild(GUILD_ID, size)
+    channel = guild.channels[COUNT_CHANNEL_ID] = FakeChannel(COUNT_CHANNEL_ID, guild)
+    counter = {"n": main.alliance["counting"][str(GUILD_ID)]["current"]}
+
+    def member():
+        return guild.get_member(rng.randrange(size))
+
+    def work():
+        return main.work_cmd.callback(FakeInteraction(guild, member()))
+
+    def rob():
+        robber, target = rng.sample(range(size), 2)
+        return main.rob_cmd.callback(FakeInteraction(guild, guild.get_member(robber)), guild.get_member(target))
+
+    def leaderboard():
+        return main.leaderboard_cmd.callback(FakeInteraction(guild, member()), "wallet", rng.randint(1, 5))
+
+    def warnings():
+        return main.warnings_cmd.callback(FakeInteraction(guild, member()), member())
+
+    def counting():
+        counter["n"] += 1
+        author = guild.get_member(counter["n"] % 2)
+        return main.on_message(FakeMessage(guild, channel, author, str(counter["n"])))
+
+    phrases = [f"phrase number {n}" for n in range(100)]
+
+    def translate():
+        return main.tr_cmd.callback(FakeInteraction(guild, member()), rng.choice(phrases), rng.choice(("en", "es", "de")))
+
+    builders = {
+        "work": work, "rob": rob, "leaderboard": leaderboard, "warnings": warnings,
+        "counting": counting, "translate": translate
+    }
+
+    def settle():
+        main.flush_pending()
+        if main.storage._compactor is not None:
+            main.storage._compactor.join()
+
+    async def bench():
+        results = {}
+        for name in SCENARIOS:
+            build = builders[name]
+            for _ in range(WARMUP):
+                await build()
+            settle()
+            bytes_before = main.storage.bytes_written
+
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(ops):
+                t = time.perf_counter()
+                await build()
+                latencies.append(time.perf_counter() - t)
+            elapsed = time.perf_counter() - started
+            settle()
+
+            latencies.sort()
+            results[name] = {
+                "ops_per_sec": ops / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "bytes_per_op": (main.storage.bytes_written - bytes_before) / ops
+            }
+        return results
+
+    results = asyncio.run(bench())
+    print(json.dumps({"size": size, "load_seconds": load_seconds, "scenarios": results}))
+
+
+# ------------------------------
+# Parent: fan out sizes, print report
+# ------------------------------
+def run_size(size, ops, seed):
+    with tempfile.TemporaryDirectory(prefix="elura-bench-") as workdir:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--sizes", str(size), "--ops", str(ops), "--seed", str(seed)],
+            cwd=workdir, capture_output=True, text=True
+        )
+    if proc.returncode != 0:
+        raise SystemExit(f"benchmark for size {size} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def report(runs):
+    print(f"{'size':>9}  {'scenario':<12} {'ops/sec':>10} {'p50 ms':>9} {'p99 ms':>9} {'bytes/op':>10}")
+    for run in runs:
+        for name, r in run["scenarios"].items():
+            print(f"{run['size']:>9}  {name:<12} {r['ops_per_sec']:>10.0f} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['bytes_per_op']:>10.1f}")
+        print(f"{run['size']:>9}  {'(startup)':<12} {run['load_seconds']:>10.2f}s")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark Elura Utility command handlers offline.")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="comma-separated users/cases per run")
+    parser.add_argument("--ops", type=int, default=2000, help="measured operations per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print raw JSON results")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    if args.child:
+        return run_child(sizes[0], args.ops, args.seed)
+
+    runs = [run_size(size, args.ops, args.seed) for size in sizes]
+    if args.json:
+        print(json.dumps(runs, indent=2))
+    else:
+        report(runs)
+
+
+if __name__ == "__main__":
+    main_cli()
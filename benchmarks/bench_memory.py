@@ -0,0 +1,109 @@
+# ============================================================
+#              ELURA UTILITY • ECONOMY MEMORY FOOTPRINT
+# ============================================================
+# Measures resident bytes per economy user for the previous layout (a dict
+# of {"wallet": .., "bank": ..} dicts straight from json.loads) against the
+# AccountTable of slotted Account records main.py now keeps in memory, then
+# touches many guild shards at random under GuildAccountCache budgets.
+#
+#   python benchmarks/bench_memory.py                # 1M users, 2000 guilds
+#   python benchmarks/bench_memory.py --users 100000 --guilds 500
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, REPO_ROOT)
+
+from fakes import write_alliances
+
+
+def measure(build):
+    """Bytes still allocated after build() returns (result kept alive)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def bench_guild_cache(main, guilds, guild_users, lookups, rng):
+    """Peak memory and lookup cost across `guilds` shards of `guild_users` users each."""
+    for guild_id in range(1, guilds + 1):
+        main.storage.shards.write(str(1000 + guild_id), {
+            str(uid): {"wallet": rng.randint(100, 5000), "bank": rng.randint(0, 5000)} for uid in range(guild_users)
+        })
+    order = [1000 + rng.randint(1, guilds) for _ in range(lookups)]
+
+    def run(budget):
+        cache = main.guild_cache
+        for key in list(cache._lru):
+            cache.state.pop(key)
+        cache._lru.clear()
+        cache.budget = budget
+        cache.loads = cache.evictions = 0
+        main.storage.join()
+        gc.collect()
+        for guild_id in order:
+            main.get_user_data(guild_id, 0)
+
+    full = guilds * guild_users * main.ACCOUNT_BYTES
+    print(f"\n{'budget MB':>10} {'peak MB':>9} {'loads':>7} {'evicted':>8} {'us/lookup':>10}")
+    for budget in (full * 2, full // 4, full // 16):
+        started = time.perf_counter()
+        run(budget)
+        elapsed = time.perf_counter() - started
+
+        # Second pass under tracemalloc (too slow to time) for the peak
+        tracemalloc.start()
+        run(budget)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{budget / 2**20:>10.1f} {peak / 2**20:>9.1f} {main.guild_cache.loads:>7} "
+              f"{main.guild_cache.evictions:>8} {elapsed / lookups * 1e6:>10.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Compare economy memory layouts.")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--guilds", type=int, default=2000, help="guild shards for the cache run")
+    parser.add_argument("--guild-users", type=int, default=200)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="elura-mem-"))
+    write_alliances("data/alliances.json", 10, 0, args.seed)
+    import main
+    main.open_storage()
+
+    rng = random.Random(args.seed)
+    raw = json.dumps({str(uid): {"wallet": rng.randint(100, 5000), "bank": rng.randint(0, 5000)}
+                      for uid in range(args.users)})
+
+    legacy, legacy_bytes = measure(lambda: json.loads(raw))
+    table, table_bytes = measure(lambda: main.AccountTable(json.loads(raw)))
+    assert len(table) == len(legacy) and table["0"]["wallet"] == legacy["0"]["wallet"]
+
+    print(f"{'layout':<14} {'total MB':>10} {'bytes/user':>11}")
+    for name, size in (("dict of dicts", legacy_bytes), ("AccountTable", table_bytes)):
+        print(f"{name:<14} {size / 2**20:>10.1f} {size / args.users:>11.1f}")
+    print(f"{'saving':<14} {(legacy_bytes - table_bytes) / 2**20:>10.1f} {1 - table_bytes / legacy_bytes:>10.0%}")
+
+    del legacy, table
+    bench_guild_cache(main, args.guilds, args.guild_users, args.lookups, rng)
+
+
+if __name__ == "__main__":
+    main_cli()
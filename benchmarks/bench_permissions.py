@@ -0,0 +1,87 @@
+# ============================================================
+#             ELURA UTILITY • PERMISSION MICROBENCHMARK
+# ============================================================
+# Compares the precompiled PermissionIndex behind has_permission() with the
+# previous implementation (list concatenation per role + rebuilding the
+# role → commands dict on every call).
+#
+#   python benchmarks/bench_permissions.py
+#   python benchmarks/bench_permissions.py --roles 5,50,250 --tier-size 25
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, REPO_ROOT)
+
+from fakes import GUILD_ID, FakeGuild, FakeMember, FakeRole, write_alliances
+
+
+def legacy_has_permission(member, command, founder, tiers):
+    """The pre-index implementation, kept here as the baseline."""
+    TIER1, TIER2, TIER3, TIER4 = tiers
+    tier = None
+    for role in member.roles:
+        if str(role.id) in TIER1 + TIER2 + TIER3 + TIER4:
+            tier = str(role.id)
+            break
+    else:
+        if str(founder) in [str(r.id) for r in member.roles]:
+            tier = "FOUNDER"
+    if tier is None:
+        return False
+    if tier == "FOUNDER":
+        return True
+    role_commands = {}
+    for t, roles in zip(["tier1", "tier2", "tier3", "tier4"], [TIER1, TIER2, TIER3, TIER4]):
+        for r in roles:
+            role_commands[str(r)] = {
+                "tier1": ["warn"],
+                "tier2": ["warn", "warnings"],
+                "tier3": ["warn", "warnings", "mute"],
+                "tier4": ["warn", "warnings", "mute", "kick", "ban", "unban"]
+            }[t]
+    return command in role_commands.get(tier, [])
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Microbenchmark has_permission().")
+    parser.add_argument("--roles", default="5,25,100", help="comma-separated role counts per member")
+    parser.add_argument("--tier-size", type=int, default=10, help="configured roles per punishment tier")
+    parser.add_argument("--number", type=int, default=20000, help="checks per measurement")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.chdir(tempfile.mkdtemp(prefix="elura-perm-"))
+    write_alliances("data/alliances.json", 10, 0, args.seed)
+    import main
+    main.open_storage()
+
+    founder = 10_000
+    tiers = [[str(1000 * (t + 1) + i) for i in range(args.tier_size)] for t in range(4)]
+    main.FOUNDER_ROLE, (main.TIER1, main.TIER2, main.TIER3, main.TIER4) = str(founder), tiers
+    main.guild_configs.invalidate()
+
+    guild = FakeGuild(GUILD_ID)
+    print(f"{'roles':>6}  {'legacy us':>10} {'index us':>10} {'speedup':>8}")
+    for role_count in [int(n) for n in args.roles.split(",") if n]:
+        # Plain roles plus one tier-1 role at the end (worst case for the old scan)
+        roles = [FakeRole(50_000 + i) for i in range(role_count - 1)] + [FakeRole(int(tiers[0][-1]))]
+        rng.shuffle(roles)
+        member = FakeMember(1, guild, roles)
+
+        assert main.has_permission(member, "warn") == legacy_has_permission(member, "warn", founder, tiers)
+        legacy = timeit.timeit(lambda: legacy_has_permission(member, "warn", founder, tiers), number=args.number)
+        indexed = timeit.timeit(lambda: main.has_permission(member, "warn"), number=args.number)
+        print(f"{role_count:>6}  {legacy / args.number * 1e6:>10.2f} {indexed / args.number * 1e6:>10.2f} {legacy / indexed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
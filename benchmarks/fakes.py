@@ -0,0 +1,151 @@
+# ============================================================
+#                  ELURA UTILITY • FAKE GATEWAY
+#   Minimal stand-ins for the discord.py objects handlers touch
+# ============================================================
+
+import json
+import os
+import random
+
+
+class FakeAsset:
+    def __init__(self, url):
+        self.url = url
+
+
+class FakeRole:
+    def __init__(self, role_id, name=""):
+        self.id = role_id
+        self.name = name
+
+
+class FakeMember:
+    def __init__(self, user_id, guild=None, roles=None):
+        self.id = user_id
+        self.guild = guild
+        self.roles = roles or []
+        self.bot = False
+        self.name = f"user{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.display_avatar = FakeAsset(f"https://cdn.discordapp.com/embed/avatars/{user_id % 5}.png")
+
+    def __str__(self):
+        return self.name
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        for role in roles:
+            if role in self.roles:
+                self.roles.remove(role)
+
+
+class FakeChannel:
+    def __init__(self, channel_id, guild=None):
+        self.id = channel_id
+        self.guild = guild
+        self.mention = f"<#{channel_id}>"
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+
+
+class FakeGuild:
+    """Members are materialized on demand so 1M-user guilds stay cheap."""
+
+    def __init__(self, guild_id, member_count=0):
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+        self.member_count = member_count
+        self.roles = []
+        self.channels = {}
+        self._members = {}
+
+    def get_member(self, user_id):
+        if user_id >= self.member_count:
+            return None
+        member = self._members.get(user_id)
+        if member is None:
+            member = self._members[user_id] = FakeMember(user_id, self)
+        return member
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+
+class FakeResponse:
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, content=None, **kwargs):
+        self.sent += 1
+
+    async def edit_message(self, **kwargs):
+        self.sent += 1
+
+    async def defer(self, **kwargs):
+        pass
+
+
+class FakeInteraction:
+    def __init__(self, guild, user):
+        self.guild = guild
+        self.user = user
+        self.response = FakeResponse()
+        self.followup = FakeChannel(0, guild)
+
+
+class FakeMessage:
+    def __init__(self, guild, channel, author, content):
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.reactions = 0
+
+    async def add_reaction(self, emoji):
+        self.reactions += 1
+
+    async def reply(self, content=None, **kwargs):
+        pass
+
+
+# ------------------------------
+# Synthetic alliances.json
+# ------------------------------
+GUILD_ID = 1
+COUNT_CHANNEL_ID = 900
+
+
+def write_alliances(path, users, cases, seed=0):
+    """Write a data/alliances.json with `users` economy rows and `cases` cases in one guild."""
+    rng = random.Random(seed)
+    guild = {str(uid): {"wallet": rng.randint(100, 5000), "bank": rng.randint(0, 5000)} for uid in range(users)}
+    case_types = ("warn", "mute", "kick", "ban")
+    state = {
+        "bot": {"token": ""},
+        "guild_settings": {"guild_id": GUILD_ID, "count_channel": COUNT_CHANNEL_ID},
+        "counting": {str(GUILD_ID): {"current": 0, "last_user": None}},
+        "punishments": {
+            "cases": [
+                {
+                    "case": f"{n:08X}",
+                    "type": case_types[n % 4],
+                    "user": rng.randrange(users),
+                    "moderator": 0,
+                    "reason": "synthetic",
+                    "timestamp": "2025-01-01 • 00:00 UTC",
+                    "guild_id": str(GUILD_ID)
+                }
+                for n in range(cases)
+            ],
+            "last_case_id": cases
+        },
+        str(GUILD_ID): guild
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(state, f)
@@ -4,15 +4,992 @@
 #         Ultra-Professional Discord Utility Framework
 # ============================================================
 
+import time
+STARTUP_CLOCK = time.perf_counter()     # taken before the heavy imports, see StartupTimer
+
+import aiohttp
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands, Embed, Interaction, File
-from deep_translator import GoogleTranslator
 from dotenv import load_dotenv
+from sortedcontainers import SortedList
 
 import json
 import os
-import aiofiles
+import sys
+import copy
+import queue
+import asyncio
+import heapq
+import math
+import array
+import datetime
+import string
+import re
+import random
+import hashlib
+import collections
+import concurrent.futures
+import atexit
+import bisect
+import logging
+import logging.handlers
+import functools
+import contextlib
+import contextvars
+import sqlite3
+import threading
+import abc
+
+# ===========================================
+# STARTUP PHASES
+# ===========================================
+# Cold start is timed phase by phase (imports, each data file, indexes,
+# module setup, login, command sync, gateway) and reported once on ready.
+
+class StartupTimer:
+    """Wall-clock duration of each startup phase, in the order they ran."""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.phases: list[tuple[str, float]] = []
+        self.reported = False
+        self._last = started
+
+    def mark(self, phase: str):
+        """Close the phase that ran since the previous mark."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return self._last - self.started
+
+    def report(self) -> str:
+        width = max(len(phase) for phase, _ in self.phases)
+        lines = [f"   {phase:<{width}}  {seconds * 1000:>9.1f} ms" for phase, seconds in self.phases]
+        lines.append(f"   {'total':<{width}}  {self.total * 1000:>9.1f} ms")
+        return "\n".join(lines)
+
+    def metrics(self) -> dict:
+        return {
+            "total_ms": round(self.total * 1000, 1),
+            "phases": {phase: round(seconds * 1000, 1) for phase, seconds in self.phases}
+        }
+
+startup = StartupTimer(STARTUP_CLOCK)
+startup.mark("imports")
+
+# ===========================================
+# STORAGE ENGINE (SNAPSHOT + WRITE-AHEAD LOG)
+# ===========================================
+# Every mutation is appended to `<file>.wal` as one JSON line instead of
+# rewriting the whole document. Once the log grows past WAL_COMPACT_RECORDS
+# it is rotated to `<file>.wal.compacting` and folded into the snapshot on a
+# background thread. Startup replays snapshot + closed segment + live log.
+#
+# Handlers never touch the disk: records are copied and queued, and a single
+# writer thread serializes them, appends them and drives compaction. Await
+# `storage.flush()` to wait until everything queued so far is on disk.
+#
+# Economy entries (top-level guild ID keys) are partitioned out of the main
+# document into one shard per guild, `guilds/<guild_id>.json` + `.wal` next
+# to it, read on first access and dropped again by GuildAccountCache.
+
+WAL_COMPACT_RECORDS = 5000
+FOLDED_SEGMENT_KEY = "_folded_segment"   # snapshot key: sha256 of the last segment compacted into it
+SNAPSHOT_GENERATIONS = 3     # alliances.json, .1, .2 ... kept for recovery
+FSYNC_INTERVAL = 1.0         # seconds between log fsyncs; 0 = every write, None = never
+
+def fsync_dir(path: str):
+    """Make a rename in `path`'s directory durable (no-op where unsupported)."""
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+_held_locks = {}
+
+def lock_exclusive(path: str) -> bool:
+    """Hold a non-blocking exclusive lock on `path` until the process exits.
+
+    False when another process holds it; locking a path this process
+    already holds succeeds.
+    """
+    if path in _held_locks:
+        return True
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handle = open(path, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _held_locks[path] = handle
+    return True
+
+def atomic_write_json(path: str, data, generations: int = SNAPSHOT_GENERATIONS, indent=4):
+    """Write `data` via temp file + fsync + rename, keeping older generations.
+
+    The target is never truncated in place: a crash leaves either the old
+    file, the new file, or the previous generation at `path.1`.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if generations > 1 and os.path.exists(path):
+        for n in range(generations - 1, 1, -1):
+            if os.path.exists(f"{path}.{n - 1}"):
+                os.replace(f"{path}.{n - 1}", f"{path}.{n}")
+        os.replace(path, f"{path}.1")
+
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+def read_json_generations(path: str, generations: int = SNAPSHOT_GENERATIONS):
+    """Return the newest generation of `path` that parses, or None.
+
+    A corrupt newest file is moved aside to `path.corrupt` rather than lost.
+    """
+    candidates = [path] + [f"{path}.{n}" for n in range(1, generations)]
+    for candidate in candidates:
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, ValueError, OSError) as e:
+            print(f"⚠️ Skipping unreadable snapshot {candidate}: {e}")
+            if candidate == path:
+                os.replace(path, path + ".corrupt")
+            continue
+        if candidate != path:
+            print(f"⚠️ Recovered {path} from {candidate}")
+        return data
+    return None
+
+def apply_record(state: dict, record: dict):
+    """Apply one log record to an in-memory document."""
+    op, path = record["op"], record["path"]
+    if not path:
+        if op == "set":
+            state.clear()
+            state.update(record["value"])
+        return
+
+    parent = state
+    for key in path[:-1]:
+        parent = parent.setdefault(key, {})
+    key = path[-1]
+
+    if op == "set":
+        parent[key] = record["value"]
+    elif op == "del":
+        parent.pop(key, None)
+    elif op == "append":
+        parent.setdefault(key, []).append(record["value"])
+    elif op == "incr":
+        parent[key] = parent.get(key, 0) + record["value"]
+    elif op == "remove":
+        items = parent.get(key, [])
+        match = next((i for i in items if i.get(record["field"]) == record["value"]), None)
+        if match is not None:
+            items.remove(match)
+
+def read_log(path: str):
+    """Yield records from a log file, stopping at a torn final line."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
+
+def is_guild_key(key) -> bool:
+    """Top-level keys that are guild IDs hold that guild's economy entries."""
+    return str(key).isdigit()
+
+class GuildShardFiles:
+    """Per-guild snapshot + log files. Only the writer thread appends or rewrites them."""
+
+    def __init__(self, directory: str, compact_records: int, generations: int):
+        self.directory = directory
+        self.compact_records = compact_records
+        self.generations = generations
+        self._logs = {}           # guild_id -> [open log, records in it]
+        self._unsynced = set()
+
+    def path(self, guild_id: str) -> str:
+        return os.path.join(self.directory, f"{guild_id}.json")
+
+    def guild_ids(self) -> list:
+        """Every guild with a snapshot or a log; new guilds only have a log until it compacts."""
+        if not os.path.isdir(self.directory):
+            return []
+        found = set()
+        for name in os.listdir(self.directory):
+            for suffix in (".json", ".json.wal"):
+                if name.endswith(suffix) and is_guild_key(name[:-len(suffix)]):
+                    found.add(name[:-len(suffix)])
+        return sorted(found, key=int)
+
+    def read(self, guild_id: str) -> dict:
+        path = self.path(guild_id)
+        data = read_json_generations(path, self.generations) or {}
+        for record in read_log(path + ".wal"):
+            apply_record(data, record)
+        return data
+
+    def write(self, guild_id: str, data: dict) -> int:
+        """Replace the shard with `data` and empty its log; returns bytes written."""
+        self.close(guild_id)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(guild_id)
+        atomic_write_json(path, data, self.generations, indent=None)
+        open(path + ".wal", "w").close()
+        return os.path.getsize(path)
+
+    def append(self, guild_id: str, records: list) -> int:
+        entry = self._logs.get(guild_id)
+        if entry is None:
+            os.makedirs(self.directory, exist_ok=True)
+            log_path = self.path(guild_id) + ".wal"
+            entry = self._logs[guild_id] = [open(log_path, "a"), sum(1 for _ in read_log(log_path))]
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+        entry[0].write(data)
+        entry[0].flush()
+        entry[1] += len(records)
+        self._unsynced.add(guild_id)
+        written = len(data.encode())
+        if entry[1] >= self.compact_records:
+            self.sync()
+            written += self.write(guild_id, self.read(guild_id))
+        return written
+
+    def sync(self):
+        for guild_id in self._unsynced:
+            entry = self._logs.get(guild_id)
+            if entry is not None:
+                os.fsync(entry[0].fileno())
+        self._unsynced.clear()
+
+    def close(self, guild_id: str):
+        entry = self._logs.pop(guild_id, None)
+        if entry is not None:
+            if guild_id in self._unsynced:
+                os.fsync(entry[0].fileno())
+                self._unsynced.discard(guild_id)
+            entry[0].close()
+
+class AllianceStorage:
+    """Snapshot + append-only log persistence for one JSON document."""
+
+    def __init__(self, path: str, compact_records: int = WAL_COMPACT_RECORDS,
+                 generations: int = SNAPSHOT_GENERATIONS, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.log_path = path + ".wal"
+        self.segment_path = path + ".wal.compacting"
+        self.compact_records = compact_records
+        self.generations = generations
+        self.fsync_interval = fsync_interval
+        self.state = None
+        self._log = None
+        self._records = 0
+        self._unsynced = False
+        self._last_sync = 0.0
+        self.fsyncs = 0
+        self.bytes_written = 0
+        self._compactor = None
+        self._queue = queue.Queue()
+        self._writer = None
+        self.shards = GuildShardFiles(os.path.join(os.path.dirname(path), "guilds"), compact_records, generations)
+        self._unloading = {}      # guild_id -> (token, table) until the writer has caught up
+        self._unloading_lock = threading.Lock()
+
+    # ----------------------------
+    # Loading
+    # ----------------------------
+    def _read_snapshot(self):
+        data = read_json_generations(self.path, self.generations)
+        return data if data is not None else {}
+
+    def load(self):
+        """Replay snapshot + log once; later calls return the live document."""
+        if self.state is not None:
+            return self.state
+
+        # Two processes appending to one log would interleave and lose each other's snapshots
+        if not lock_exclusive(self.path + ".lock"):
+            raise RuntimeError(
+                f"{self.path} is open in another process. Sharded workers share state through "
+                f"SQLite instead (see `python main.py launch`)."
+            )
+
+        # A leftover closed segment means a compaction never finished
+        if os.path.exists(self.segment_path):
+            self._compact_segment()
+
+        state = self._read_snapshot()
+        state.pop(FOLDED_SEGMENT_KEY, None)
+        for record in read_log(self.log_path):
+            apply_record(state, record)
+            self._records += 1
+
+        # Documents written before partitioning keep every guild inline: move them out once
+        legacy = [key for key in state if is_guild_key(key)]
+        if legacy:
+            for guild_id in legacy:
+                self.bytes_written += self.shards.write(guild_id, state.pop(guild_id))
+            self._write_snapshot(state)
+            open(self.log_path, "w").close()
+            self._records = 0
+            print(f"📦 Moved {len(legacy)} guild economy section(s) into {self.shards.directory}/")
+
+        self.state = state
+        self._log = open(self.log_path, "a")
+        self._writer = threading.Thread(target=self._run_writer, name="alliance-writer", daemon=True)
+        self._writer.start()
+        return state
+
+    # ----------------------------
+    # Enqueueing (called from handlers)
+    # ----------------------------
+    def write(self, records):
+        """Queue records for the writer thread. Values are copied here."""
+        if records:
+            self._queue.put(("records", copy.deepcopy(records)))
+
+    def set(self, data: dict, *paths):
+        """Log the current value found at each key path of `data`."""
+        records = []
+        for path in paths:
+            node = data
+            for key in path:
+                if not isinstance(node, dict) or key not in node:
+                    records.append({"op": "del", "path": list(path)})
+                    break
+                node = node[key]
+            else:
+                records.append({"op": "set", "path": list(path), "value": node})
+        self.write(records)
+
+    def append(self, path, value):
+        self.write([{"op": "append", "path": list(path), "value": value}])
+
+    def remove(self, path, field: str, value):
+        self.write([{"op": "remove", "path": list(path), "field": field, "value": value}])
+
+    async def allocate(self, path, n: int = 1) -> int:
+        """Add `n` to the counter at `path` and return its new value."""
+        parent = self.state
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = parent.get(path[-1], 0) + n
+        self.write([{"op": "incr", "path": list(path), "value": n}])
+        return parent[path[-1]]
+
+    def checkpoint(self, state: dict):
+        """Queue the whole document as the new snapshot and reset the log."""
+        self._queue.put(("checkpoint", copy.deepcopy(state)))
+
+    async def flush(self):
+        """Wait until every change queued so far has been written."""
+        if self._writer is None:
+            return
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        self._queue.put(("flush", lambda: loop.call_soon_threadsafe(done.set_result, None)))
+        await done
+
+    def join(self):
+        """Blocking flush for shutdown paths without an event loop."""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.join()
+
+    # ----------------------------
+    # Guild partitions
+    # ----------------------------
+    def guild_ids(self) -> list:
+        return self.shards.guild_ids()
+
+    def load_guild(self, guild_id: str):
+        """A guild's economy entries: the table still being unloaded, else read from its shard."""
+        with self._unloading_lock:
+            pending = self._unloading.get(guild_id)
+        if pending is not None:
+            return pending[1]
+        return self._read_guild(guild_id)
+
+    def unload_guild(self, guild_id: str, table):
+        """Release a guild once every record queued for it so far has been written.
+
+        Until then load_guild() hands back `table` itself, so a quick reload
+        never reads a shard the writer is still appending to.
+        """
+        token = object()
+        with self._unloading_lock:
+            self._unloading[guild_id] = (token, table)
+
+        def release():
+            self._close_guild(guild_id)
+            with self._unloading_lock:
+                if self._unloading.get(guild_id, (None,))[0] is token:
+                    del self._unloading[guild_id]
+
+        self._queue.put(("call", release))
+
+    def _read_guild(self, guild_id: str) -> dict:
+        return self.shards.read(guild_id)
+
+    def _close_guild(self, guild_id: str):
+        self.shards.close(guild_id)
+
+    # ----------------------------
+    # Queries (served from memory for the JSON backend)
+    # ----------------------------
+    async def user_cases(self, guild_id, user_id: int):
+        """Cases for a member in a guild; legacy cases without a guild match any guild."""
+        return self.state["punishments"]["cases"].for_member(guild_id, user_id)
+
+    # ----------------------------
+    # Writer thread
+    # ----------------------------
+    def _run_writer(self):
+        while True:
+            # While unsynced data is buffered, wake up in time to fsync it
+            timeout = self.fsync_interval if self._unsynced and self.fsync_interval else None
+            try:
+                kind, payload = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._sync()
+                continue
+            try:
+                if kind == "records":
+                    self._append(payload)
+                elif kind == "checkpoint":
+                    self._checkpoint(payload)
+                elif kind == "flush":
+                    self._sync()
+                    payload()
+                elif kind == "call":
+                    payload()
+            except Exception:
+                log.exception("Storage error")
+            finally:
+                self._queue.task_done()
+
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._log.fileno())
+            self.shards.sync()
+            self._unsynced = False
+            self._last_sync = time.monotonic()
+            self.fsyncs += 1
+
+    def _append(self, records):
+        # Economy records go to their guild's shard, relative to the guild
+        by_guild = {}
+        for record in records:
+            if record["path"] and is_guild_key(record["path"][0]):
+                by_guild.setdefault(str(record["path"][0]), []).append({**record, "path": record["path"][1:]})
+        if by_guild:
+            records = [r for r in records if not (r["path"] and is_guild_key(r["path"][0]))]
+            for guild_id, guild_records in by_guild.items():
+                self.bytes_written += self.shards.append(guild_id, guild_records)
+            self._unsynced = True
+
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+        self._log.write(data)
+        self._log.flush()
+        self.bytes_written += len(data.encode())
+        self._unsynced = True
+        self._records += len(records)
+
+        # Batch fsyncs: at most one per fsync_interval (0 = every write)
+        if self.fsync_interval is not None and time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync()
+
+        if self._records >= self.compact_records:
+            self._compact()
+
+    def _checkpoint(self, state: dict):
+        if self._compactor is not None:
+            self._compactor.join()
+        for guild_id in [key for key in state if is_guild_key(key)]:
+            self.bytes_written += self.shards.write(guild_id, state.pop(guild_id))
+        self._write_snapshot(state)
+        self._log.close()
+        self._log = open(self.log_path, "w")
+        self._unsynced = False
+        self._records = 0
+
+    # ----------------------------
+    # Compaction
+    # ----------------------------
+    def _write_snapshot(self, state: dict):
+        atomic_write_json(self.path, state, self.generations)
+        self.bytes_written += os.path.getsize(self.path)
+
+    def _compact_segment(self):
+        with open(self.segment_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        state = self._read_snapshot()
+        # append/incr records are not idempotent: a segment the snapshot already
+        # holds (crash between the write and the remove below) is not replayed again
+        if state.pop(FOLDED_SEGMENT_KEY, None) != digest:
+            for record in read_log(self.segment_path):
+                apply_record(state, record)
+        state[FOLDED_SEGMENT_KEY] = digest
+        self._write_snapshot(state)
+        os.remove(self.segment_path)
+
+    def _compact(self):
+        """Rotate the live log and fold it into the snapshot in the background."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._sync()
+        self._log.close()
+        os.replace(self.log_path, self.segment_path)
+        self._log = open(self.log_path, "a")
+        self._records = 0
+        self._compactor = threading.Thread(target=self._compact_segment, name="alliance-compactor", daemon=True)
+        self._compactor.start()
+
+# ===========================================
+# SQLITE BACKEND (OPTIONAL, ELURA_STORAGE=sqlite)
+# ===========================================
+# Same write path as the JSON engine (records queued to one writer thread),
+# but each batch is applied as a single BEGIN IMMEDIATE transaction against
+# indexed tables, so several shard processes can share one database. Economy rows, cases and counting state get their own tables; every
+# other top-level section is kept as a JSON document. Queries run on the
+# writer thread too, so they never block the loop and always see prior writes.
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS economy (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    wallet INTEGER NOT NULL DEFAULT 0,
+    bank INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cases (
+    case_id TEXT PRIMARY KEY,
+    guild_id INTEGER,
+    user_id INTEGER,
+    type TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cases_member ON cases (guild_id, user_id, type);
+CREATE TABLE IF NOT EXISTS counting (
+    guild_id INTEGER PRIMARY KEY,
+    current INTEGER NOT NULL DEFAULT 0,
+    last_user TEXT,
+    data TEXT NOT NULL
+);
+"""
+
+SQLITE_BUSY_TIMEOUT = 30.0   # seconds to wait for another process's write lock
+# Rows a whole-section write may replace: this process's guilds and legacy guild-less cases
+OWNED_ROWS = "guild_id IS NULL OR owns_guild(guild_id)"
+
+def _snowflake(value):
+    """Store numeric IDs as integers; anything else (legacy None, etc.) as NULL."""
+    return int(value) if value is not None and str(value).isdigit() else None
+
+class SQLiteStorage(AllianceStorage):
+    """sqlite3 (WAL mode) persistence with indexed economy, case and counting tables.
+
+    `owns_guild(guild_id)` limits which guilds' cases and counting rows are
+    loaded, replaced or deleted; other processes own the rest. Documents are
+    shared and every record is merged into the current row inside the write
+    transaction.
+    """
+
+    def __init__(self, path: str, owns_guild=None):
+        super().__init__(path)
+        self.conn = None
+        self.reader = None
+        self.sharded = owns_guild is not None
+        self.owns_guild = owns_guild or (lambda guild_id: True)
+
+    def load(self):
+        if self.state is not None:
+            return self.state
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Only one thread uses the connection at a time: this one, then the writer.
+        # Transactions are explicit (isolation_level=None); other processes' locks are waited out.
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self.conn.create_function("owns_guild", 1, lambda guild_id: bool(self.owns_guild(guild_id)), deterministic=True)
+
+        # Guild partitions are read on demand through a second connection (WAL readers never block)
+        self.reader = sqlite3.connect(self.path, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT)
+
+        state = {}
+        for key, value in self.conn.execute("SELECT key, value FROM documents"):
+            state[key] = json.loads(value)
+        cases = [
+            json.loads(data) for guild_id, data in self.conn.execute("SELECT guild_id, data FROM cases ORDER BY rowid")
+            if guild_id is None or self.owns_guild(guild_id)
+        ]
+        if cases or "punishments" in state:
+            state.setdefault("punishments", {})["cases"] = cases
+        for guild_id, data in self.conn.execute("SELECT guild_id, data FROM counting"):
+            if self.owns_guild(guild_id):
+                state.setdefault("counting", {})[str(guild_id)] = json.loads(data)
+
+        self.state = state
+        self._writer = threading.Thread(target=self._run_writer, name="alliance-writer", daemon=True)
+        self._writer.start()
+        return state
+
+    # ----------------------------
+    # Writer thread
+    # ----------------------------
+    def _sync(self):
+        pass  # every batch is committed; WAL mode handles durability
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE takes the write lock up front, so read-modify-write of a
+        shared document can't interleave with another process's commit."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _append(self, records):
+        with self._transaction():
+            for record in records:
+                self._apply(record)
+
+    def _checkpoint(self, state: dict):
+        with self._transaction():
+            self._replace_all(state)
+
+    def _replace_all(self, state: dict):
+        """Rewrite everything from `state`; runs inside the caller's transaction."""
+        # Shared documents this process doesn't hold belong to other workers
+        if not self.sharded:
+            self.conn.execute("DELETE FROM documents")
+        self.conn.execute(f"DELETE FROM cases WHERE {OWNED_ROWS}")
+        self.conn.execute(f"DELETE FROM counting WHERE {OWNED_ROWS}")
+        # Only resident guilds are in `state`; evicted and other workers' guilds keep their rows
+        for key, value in state.items():
+            self._apply({"op": "set", "path": [key], "value": value})
+
+    def _apply(self, record: dict):
+        path = record["path"]
+        if not path:
+            # Root-level set: already inside _append's transaction
+            return self._replace_all(record["value"] if record["op"] == "set" else {})
+
+        head = str(path[0])
+        if head.isdigit():
+            self._apply_economy(record)
+        elif head == "punishments" and (len(path) == 1 or path[1] == "cases"):
+            self._apply_cases(record)
+        elif head == "counting" and (len(path) == 1 or str(path[1]).isdigit()):
+            self._apply_counting(record)
+        else:
+            self._apply_document(record)
+
+    def guild_ids(self) -> list:
+        return [str(guild_id) for (guild_id,) in self.reader.execute("SELECT DISTINCT guild_id FROM economy")]
+
+    def _read_guild(self, guild_id: str) -> dict:
+        rows = self.reader.execute("SELECT user_id, data FROM economy WHERE guild_id = ?", (int(guild_id),))
+        return {str(user_id): json.loads(data) for user_id, data in rows}
+
+    def _close_guild(self, guild_id: str):
+        pass  # rows are committed as they are written
+
+    def _apply_document(self, record: dict):
+        key = str(record["path"][0])
+        row = self.conn.execute("SELECT value FROM documents WHERE key = ?", (key,)).fetchone()
+        doc = {key: json.loads(row[0])} if row else {}
+        apply_record(doc, record)
+        if key not in doc:
+            self.conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+            return
+
+        value = doc[key]
+        # Indexed collections live in their own tables
+        if key == "punishments" and isinstance(value, dict):
+            value = {k: v for k, v in value.items() if k != "cases"}
+        elif key == "counting" and isinstance(value, dict):
+            value = {k: v for k, v in value.items() if not str(k).isdigit()}
+        self.conn.execute("INSERT OR REPLACE INTO documents (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def _put_user(self, guild_id, user_id, data: dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO economy (guild_id, user_id, wallet, bank, data) VALUES (?, ?, ?, ?, ?)",
+            (int(guild_id), int(user_id), data.get("wallet", 0), data.get("bank", 0), json.dumps(data))
+        )
+
+    def _apply_economy(self, record: dict):
+        op, path = record["op"], record["path"]
+        guild_id = int(path[0])
+        if len(path) == 1:
+            self.conn.execute("DELETE FROM economy WHERE guild_id = ?", (guild_id,))
+            if op == "set":
+                for user_id, data in record["value"].items():
+                    self._put_user(guild_id, user_id, data)
+            return
+
+        user_id = int(path[1])
+        if len(path) == 2:
+            if op == "set":
+                self._put_user(guild_id, user_id, record["value"])
+            else:
+                self.conn.execute("DELETE FROM economy WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
+            return
+
+        # Deeper path: read-modify-write the single row
+        row = self.conn.execute(
+            "SELECT data FROM economy WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)
+        ).fetchone()
+        data = json.loads(row[0]) if row else {"wallet": 0, "bank": 0}
+        apply_record(data, {**record, "path": path[2:]})
+        self._put_user(guild_id, user_id, data)
+
+    def _put_case(self, case: dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cases (case_id, guild_id, user_id, type, data) VALUES (?, ?, ?, ?, ?)",
+            (case["case"], _snowflake(case.get("guild_id")), _snowflake(case.get("user")), case.get("type"), json.dumps(case))
+        )
+
+    def _apply_cases(self, record: dict):
+        op, path = record["op"], record["path"]
+        if len(path) == 1:
+            # Whole punishments section: cases to the table, the rest to documents
+            self.conn.execute(f"DELETE FROM cases WHERE {OWNED_ROWS}")
+            for case in (record["value"].get("cases", []) if op == "set" else []):
+                self._put_case(case)
+            self._apply_document(record)
+        elif op == "append":
+            self._put_case(record["value"])
+        elif op == "remove":
+            self.conn.execute("DELETE FROM cases WHERE case_id = ?", (record["value"],))
+        else:
+            self.conn.execute(f"DELETE FROM cases WHERE {OWNED_ROWS}")
+            for case in (record["value"] if op == "set" else []):
+                self._put_case(case)
+
+    def _put_counting(self, guild_id, data: dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO counting (guild_id, current, last_user, data) VALUES (?, ?, ?, ?)",
+            (int(guild_id), data.get("current", 0), data.get("last_user"), json.dumps(data))
+        )
+
+    def _apply_counting(self, record: dict):
+        op, path = record["op"], record["path"]
+        if len(path) == 1:
+            self.conn.execute(f"DELETE FROM counting WHERE {OWNED_ROWS}")
+            for guild_id, data in (record["value"].items() if op == "set" else []):
+                if str(guild_id).isdigit() and isinstance(data, dict):
+                    self._put_counting(guild_id, data)
+            self._apply_document(record)
+            return
+
+        guild_id = int(path[1])
+        if len(path) == 2:
+            if op == "set":
+                self._put_counting(guild_id, record["value"])
+            else:
+                self.conn.execute("DELETE FROM counting WHERE guild_id = ?", (guild_id,))
+            return
+
+        row = self.conn.execute("SELECT data FROM counting WHERE guild_id = ?", (guild_id,)).fetchone()
+        data = json.loads(row[0]) if row else {}
+        apply_record(data, {**record, "path": path[2:]})
+        self._put_counting(guild_id, data)
+
+    # ----------------------------
+    # Indexed queries (run on the writer thread)
+    # ----------------------------
+    async def _call(self, fn):
+        """Run fn() on the writer thread and await its result."""
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+
+        def run():
+            try:
+                value = fn()
+            except Exception as e:
+                loop.call_soon_threadsafe(result.set_exception, e)
+            else:
+                loop.call_soon_threadsafe(result.set_result, value)
+
+        self._queue.put(("call", run))
+        return await result
+
+    async def fetch(self, sql: str, params=()):
+        return await self._call(lambda: self.conn.execute(sql, params).fetchall())
+
+    async def allocate(self, path, n: int = 1) -> int:
+        """Increment a counter inside a shared document in SQL, so workers never hand out the same value."""
+        key, field = str(path[0]), "$." + ".".join(str(k) for k in path[1:])
+
+        def run():
+            with self._transaction():
+                self.conn.execute("INSERT INTO documents (key, value) VALUES (?, '{}') ON CONFLICT (key) DO NOTHING", (key,))
+                return self.conn.execute(
+                    "UPDATE documents SET value = json_set(value, ?, COALESCE(json_extract(value, ?), 0) + ?) "
+                    "WHERE key = ? RETURNING json_extract(value, ?)",
+                    (field, field, n, key, field)
+                ).fetchall()[0][0]
+
+        value = await self._call(run)
+        parent = self.state
+        for k in path[:-1]:
+            parent = parent.setdefault(k, {})
+        parent[path[-1]] = value
+        return value
+
+    async def user_cases(self, guild_id, user_id: int):
+        rows = await self.fetch(
+            "SELECT rowid, data FROM cases WHERE guild_id = ? AND user_id = ? "
+            "UNION ALL "
+            "SELECT rowid, data FROM cases WHERE guild_id IS NULL AND user_id = ?",
+            (_snowflake(guild_id), user_id, user_id)
+        )
+        return [json.loads(data) for _, data in sorted(rows)]
+
+def migrate_to_sqlite(json_path: str, db_path: str):
+    """Import an existing alliances.json (snapshot + log) into a SQLite database."""
+    source = AllianceStorage(json_path)
+    state = dict(source.load())
+    for guild_id in source.guild_ids():
+        state[guild_id] = source.load_guild(guild_id)
+    target = SQLiteStorage(db_path)
+    target.load()
+    target.checkpoint(state)
+    target.join()
+
+    # Refuse to hand over a database that lost economy rows on the way
+    expected = sum(len(state[key]) for key in state if is_guild_key(key))
+    (migrated,) = target.reader.execute("SELECT COUNT(*) FROM economy").fetchone()
+    if migrated != expected:
+        raise RuntimeError(f"Migrated {migrated} of {expected} economy rows from {json_path} into {db_path}")
+    return state
+
+# ===========================================
+# WRITE-BEHIND SCHEDULER (DIRTY-FLAG COALESCING)
+# ===========================================
+# Handlers mark key paths dirty instead of writing them. A tasks.loop flushes
+# the dirty set every FLUSH_INTERVAL seconds (or as soon as FLUSH_THRESHOLD
+# changes are pending), reading each path's value at flush time, so fifty
+# /work calls between two flushes cost one log record.
+
+WRITE_SECTIONS = ("punishments", "counting", "guild_settings")
+
+def path_section(path) -> str:
+    """Economy entries live under guild IDs; everything else is its own section."""
+    head = str(path[0]) if path else ""
+    if head in WRITE_SECTIONS:
+        return head
+    return "economy" if head.isdigit() else head or "root"
+
+class WriteBehind:
+    """Coalesces dirty key paths and list operations in front of a storage."""
+
+    def __init__(self, storage: AllianceStorage, threshold: int):
+        self.storage = storage
+        self.threshold = threshold
+        self._dirty = {}
+        self._ops = []
+        self.requested = {}
+        self.performed = {}
+        self.avoided = {}
+        self.flushes = 0
+
+    def _count(self, counter: dict, path, n: int = 1):
+        section = path_section(path)
+        counter[section] = counter.get(section, 0) + n
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty) + len(self._ops)
+
+    def mark_dirty(self, *paths):
+        for path in paths:
+            path = tuple(path)
+            if path in self._dirty:
+                self._count(self.avoided, path)
+            self._dirty[path] = True
+            self._count(self.requested, path)
+        if self.pending >= self.threshold:
+            self.flush()
+
+    def append(self, path, value):
+        self._ops.append({"op": "append", "path": list(path), "value": value})
+        self._count(self.requested, path)
+        if self.pending >= self.threshold:
+            self.flush()
+
+    def remove(self, path, field: str, value):
+        self._ops.append({"op": "remove", "path": list(path), "field": field, "value": value})
+        self._count(self.requested, path)
+        if self.pending >= self.threshold:
+            self.flush()
+
+    def flush(self):
+        """Hand every pending change to the storage writer in one batch."""
+        if not self.pending:
+            return
+        dirty, ops = list(self._dirty), self._ops
+        self._dirty, self._ops = {}, []
+
+        # List operations first; path values are read now and reflect them
+        self.storage.write(ops)
+        self.storage.set(self.storage.state, *dirty)
+
+        for record in ops:
+            self._count(self.performed, record["path"])
+        for path in dirty:
+            self._count(self.performed, path)
+        self.flushes += 1
+
+    def metrics(self) -> dict:
+        """Writes requested by handlers vs records written and coalesced away, per section."""
+        sections = {
+            section: {
+                "requested": self.requested.get(section, 0),
+                "performed": self.performed.get(section, 0),
+                "avoided": self.avoided.get(section, 0)
+            }
+            for section in self.requested
+        }
+        return {"flushes": self.flushes, "pending": self.pending, "sections": sections}
 
 # ===========================================
 # ALL-IN-ONE JSON FILE
@@ -41,7 +1018,8 @@ default_alliance = {
         "welcome_message": "Welcome **{usermention}**! You’ve successfully joined **{guildname}**. We hope you enjoy your stay.",
         "leave_message": "**{usermention}** has left **{guildname}**. We hope to see them again in the future.",
         "welcome_color": "#1e466f",
-        "leave_color": "#ff3b3b"
+        "leave_color": "#ff3b3b",
+        "join_digest_rate": 10
     },
     "economy": {
         "starting_balance": 0,
@@ -64,33 +1042,26 @@ default_alliance = {
 }
 
 # -------------------------------------------
-# Load alliance.json safely
+# Load alliance.json safely (once, at startup)
 # -------------------------------------------
-def load_alliance():
-    if not os.path.exists(ALLIANCE_FILE):
-        with open(ALLIANCE_FILE, "w") as f:
-            json.dump(default_alliance, f, indent=4)
+def load_alliance_config():
+    # Newest readable generation wins; a corrupt file is never overwritten
+    data = read_json_generations(ALLIANCE_FILE)
+    if data is None:
+        save_alliance_config(default_alliance)
         return default_alliance
 
-    try:
-        with open(ALLIANCE_FILE, "r") as f:
-            data = json.load(f)
-            # Ensure all top-level keys exist
-            for key, value in default_alliance.items():
-                if key not in data:
-                    data[key] = value
-            return data
-    except (json.JSONDecodeError, ValueError):
-        with open(ALLIANCE_FILE, "w") as f:
-            json.dump(default_alliance, f, indent=4)
-        return default_alliance
+    # Ensure all top-level keys exist
+    for key, value in default_alliance.items():
+        if key not in data:
+            data[key] = value
+    return data
 
 # -------------------------------------------
 # Save alliance.json
 # -------------------------------------------
-def save_alliance(data):
-    with open(ALLIANCE_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+def save_alliance_config(data):
+    atomic_write_json(ALLIANCE_FILE, data)
 
 # -------------------------------------------
 # Async helpers for reading/writing JSON sections
@@ -102,12 +1073,13 @@ async def read_json_section(section: str):
 async def write_json_section(section: str, value):
     data = load_alliance()
     data[section] = value
-    save_alliance(data)
+    save_alliance(data, (section,))
 
 # ===========================================
 # Load on startup
 # ===========================================
-alliance = load_alliance()
+alliance = load_alliance_config()
+startup.mark("alliance.json")
 
 # Bot & roles
 TOKEN = alliance["bot"]["token"]
@@ -117,17 +1089,98 @@ TIER2 = alliance["punishment_roles"].get("tier2", [])
 TIER3 = alliance["punishment_roles"].get("tier3", [])
 TIER4 = alliance["punishment_roles"].get("tier4", [])
 
-# Guild channels & messages
-WELCOME_CHANNEL = alliance["guild_settings"].get("welcome_channel")
-LEAVE_CHANNEL = alliance["guild_settings"].get("leave_channel")
-LOGS_CHANNEL = alliance["guild_settings"].get("logs_channel")
-COUNT_CHANNEL = alliance["guild_settings"].get("count_channel")
-ECONOMY_CHANNEL = alliance["guild_settings"].get("economy_channel")
+# Guild channels & messages (per guild, see GuildSettingsCache)
+GUILD_SETTING_CHANNELS = ("welcome_channel", "leave_channel", "logs_channel", "count_channel", "economy_channel")
+
+def parse_color(value, fallback: str) -> int:
+    """'#1e466f' → 0x1e466f; unparsable values fall back to the default color."""
+    try:
+        return int(str(value).lstrip("#"), 16)
+    except ValueError:
+        return int(fallback.lstrip("#"), 16)
+
+class GuildConfig:
+    """Pre-parsed settings for one guild: int channel IDs (or None), int colors and permissions."""
+    __slots__ = ("guild_id",) + GUILD_SETTING_CHANNELS + (
+        "welcome_template", "leave_template", "welcome_color", "leave_color", "digest_rate", "permissions",
+        "leave_embed", "_welcome_embed"
+    )
+
+    def __init__(self, guild_id: int, raw: dict):
+        defaults = default_alliance["guild_settings"]
+        self.guild_id = guild_id
+        for key in GUILD_SETTING_CHANNELS:
+            value = raw.get(key)
+            setattr(self, key, int(value) if value else None)
+        self.welcome_template = self._template(raw, "welcome_message", defaults)
+        self.leave_template = self._template(raw, "leave_message", defaults)
+        self.welcome_color = parse_color(raw.get("welcome_color"), defaults["welcome_color"])
+        self.leave_color = parse_color(raw.get("leave_color"), defaults["leave_color"])
+        self.leave_embed = EmbedTemplate("Member Left", self.leave_color)
+        self._welcome_embed = (None, None)
+        self.digest_rate = int(raw.get("join_digest_rate") or defaults["join_digest_rate"])
+        self.permissions = PermissionIndex(
+            raw.get("founder_role", FOUNDER_ROLE),
+            raw.get("punishment_roles") or {"tier1": TIER1, "tier2": TIER2, "tier3": TIER3, "tier4": TIER4},
+            guild_id
+        )
 
-WELCOME_MESSAGE = alliance["guild_settings"].get("welcome_message")
-LEAVE_MESSAGE = alliance["guild_settings"].get("leave_message")
-WELCOME_COLOR = alliance["guild_settings"].get("welcome_color", "#1e466f")
-LEAVE_COLOR = alliance["guild_settings"].get("leave_color", "#ff3b3b")
+    def _template(self, raw: dict, key: str, defaults: dict) -> "MessageTemplate":
+        try:
+            return MessageTemplate(raw.get(key) or defaults[key])
+        except ValueError as e:
+            log.warning("guild %s: invalid %s, using the default (%s)", self.guild_id, key, e)
+            return MessageTemplate(defaults[key])
+
+    def welcome_embed(self, guild_name: str) -> "EmbedTemplate":
+        """Welcome prototype for the guild's current name (rebuilt only on rename)."""
+        name, template = self._welcome_embed
+        if name != guild_name:
+            template = EmbedTemplate(f"Welcome to {guild_name}!", self.welcome_color)
+            self._welcome_embed = (guild_name, template)
+        return template
+
+class GuildSettingsCache:
+    """guild_id → GuildConfig, built on first use and dropped when /setup commits.
+
+    Per-guild values live in alliance["guild_settings"]["guilds"][guild_id]. The
+    flat guild_settings keys from single-guild setups still apply as fallbacks
+    to the guild named by guild_settings.guild_id (or to every guild if unset).
+    """
+
+    def __init__(self):
+        self._configs: dict[int, GuildConfig] = {}
+
+    def get(self, guild_id: int) -> GuildConfig:
+        config = self._configs.get(guild_id)
+        if config is None:
+            config = self._configs[guild_id] = GuildConfig(guild_id, self._raw(guild_id))
+        return config
+
+    def _raw(self, guild_id: int) -> dict:
+        settings = alliance.get("guild_settings", {})
+        raw = {}
+        legacy_guild = settings.get("guild_id")
+        if not legacy_guild or int(legacy_guild) == guild_id:
+            raw.update((k, v) for k, v in settings.items() if k != "guilds")
+        raw.update(settings.get("guilds", {}).get(str(guild_id), {}))
+        return raw
+
+    def update(self, guild_id: int, values: dict):
+        """Store non-empty `values` for one guild, persist them and reload its config."""
+        guilds = alliance.setdefault("guild_settings", {}).setdefault("guilds", {})
+        entry = guilds.setdefault(str(guild_id), {})
+        entry.update((k, v) for k, v in values.items() if v is not None)
+        save_alliance(alliance, ("guild_settings", "guilds", str(guild_id)))
+        self.invalidate(guild_id)
+
+    def invalidate(self, guild_id: int = None):
+        if guild_id is None:
+            self._configs.clear()
+        else:
+            self._configs.pop(guild_id, None)
+
+guild_configs = GuildSettingsCache()
 
 # Economy
 STARTING_BALANCE = alliance["economy"].get("starting_balance", 0)
@@ -155,44 +1208,525 @@ intents.members = True
 intents.guilds = True
 intents.reactions = True
 
-bot = commands.Bot(
+# ------------------------------
+# Sharding
+# ------------------------------
+# One process runs every shard by default (discord.py picks the count).
+# `python main.py launch` starts worker processes that each run a block of
+# shard IDs via ELURA_SHARD_COUNT / ELURA_SHARD_IDS. A guild's events only
+# reach the process owning its shard, so that process alone loads and
+# writes the guild's state (see SQLiteStorage.owns_guild).
+
+def parse_shard_ids(value: str):
+    """'0,1,4-7' → [0, 1, 4, 5, 6, 7]; empty → None."""
+    ids = []
+    for part in filter(None, (p.strip() for p in (value or "").split(","))):
+        first, _, last = part.partition("-")
+        ids.extend(range(int(first), int(last or first) + 1))
+    return sorted(set(ids)) or None
+
+SHARD_COUNT = int(os.getenv("ELURA_SHARD_COUNT") or 0) or None
+SHARD_IDS = parse_shard_ids(os.getenv("ELURA_SHARD_IDS", ""))
+WORKER_ID = os.getenv("ELURA_WORKER")          # set by the launcher
+if SHARD_IDS is not None and (SHARD_COUNT is None or SHARD_IDS[-1] >= SHARD_COUNT):
+    raise SystemExit(f"❌ ELURA_SHARD_IDS {SHARD_IDS} needs ELURA_SHARD_COUNT greater than {SHARD_IDS[-1]}.")
+_owned_shards = frozenset(SHARD_IDS or ())
+
+def shard_for_guild(guild_id, shard_count: int) -> int:
+    return (int(guild_id) >> 22) % shard_count
+
+def owns_guild(guild_id) -> bool:
+    """Whether this process's shards receive the guild's events (always, unless given shard IDs)."""
+    return SHARD_IDS is None or shard_for_guild(guild_id, SHARD_COUNT) in _owned_shards
+
+class EluraTree(app_commands.CommandTree):
+    """Times every app command through the tree's public check/completion/error hooks."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type is discord.InteractionType.application_command:
+            start_command(interaction)
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        command = interaction.command
+        finish_command(interaction, command)
+        if isinstance(error, app_commands.CommandInvokeError) and command is not None:
+            stats.record_error(command_name(command))
+            log.exception("Unhandled error in %s", command_name(command), exc_info=error.original)
+        await super().on_error(interaction, error)
+
+http_trace = aiohttp.TraceConfig()   # callbacks attached in the instrumentation section
+
+class EluraBot(commands.AutoShardedBot):
+    def event(self, coro):
+        # Handlers registered with @bot.event are timed like app commands
+        return super().event(instrumented(coro.__name__, coro))
+
+    def dispatch(self, event_name: str, /, *args, **kwargs):
+        # Dispatched synchronously right after the callback returns, so the
+        # command is timed here rather than in a scheduled listener
+        if event_name == "app_command_completion":
+            finish_command(*args)
+        super().dispatch(event_name, *args, **kwargs)
+
+
+    async def setup_hook(self):
+        startup.mark("login")
+        probe_loop_lag.start()
+        log_stats.start()
+        flush_alliance.start()
+        checkpoint_counting.start()
+        mute_scheduler.start()
+        if WORKER_ID is not None:
+            publish_shard_status.start()
+
+        # Global commands are shared: only the process running shard 0 syncs them
+        if SHARD_IDS is None or 0 in _owned_shards:
+            try:
+                synced = await sync_command_tree()
+            except discord.HTTPException:
+                log.exception("App command sync failed; retrying on next start")
+                synced = None
+            startup.mark("command sync" + {True: "", False: " (unchanged, skipped)", None: " (failed)"}[synced])
+
+    async def close(self):
+        # Drain dirty and queued alliance writes before the loop goes away
+        flush_alliance.cancel()
+        checkpoint_counting.cancel()
+        publish_shard_status.cancel()
+        counting.checkpoint()
+        write_behind.flush()
+        await storage.flush()
+        translator.close()
+        ban_cache.close()
+        await log_queue.drain()
+        await super().close()
+
+bot = EluraBot(
     command_prefix=".",              # slash + dot both supported
     intents=intents,
-    help_command=None                # custom /help later
+    help_command=None,               # custom /help later
+    tree_cls=EluraTree,
+    http_trace=http_trace,
+    shard_count=SHARD_COUNT,
+    shard_ids=SHARD_IDS
 )
 
 tree = bot.tree
 
+# ------------------------------
+# App command sync (only when signatures change)
+# ------------------------------
+COMMAND_HASH_PATH = ("bot", "command_tree_hash")
+# Resync even when the hash matches, e.g. after commands were edited on Discord's side:
+# `python main.py --force-sync` or ELURA_FORCE_SYNC=1
+FORCE_COMMAND_SYNC = "--force-sync" in sys.argv or os.getenv("ELURA_FORCE_SYNC", "") not in ("", "0")
+
+def command_tree_hash() -> str:
+    """sha256 of every global app command payload, independent of registration order."""
+    payloads = sorted(
+        (command.to_dict(tree) for command in tree.get_commands()),
+        key=lambda payload: (payload.get("type", 1), payload["name"])
+    )
+    return hashlib.sha256(json.dumps(payloads, sort_keys=True).encode()).hexdigest()
+
+async def sync_command_tree(force: bool = FORCE_COMMAND_SYNC) -> bool:
+    """tree.sync() unless the tree is identical to the last successful sync (or `force`)."""
+    digest = command_tree_hash()
+    settings = alliance.setdefault("bot", {})
+    if not force and settings.get("command_tree_hash") == digest:
+        return False
+    synced = await tree.sync()
+    settings["command_tree_hash"] = digest
+    save_alliance(alliance, COMMAND_HASH_PATH)
+    log.info("Synced %d app commands (tree %s)", len(synced), digest[:12])
+    return True
+
 # ============================================================
-#                   PERMISSION CHECK SYSTEM
+#              INSTRUMENTATION (LATENCY / ERRORS / LAG)
 # ============================================================
+# App commands are timed through EluraTree's check/completion/error hooks and
+# bot.event handlers are wrapped as they are registered (EluraBot.event). Each
+# records a latency histogram, the share of that time spent in persistence and
+# in Discord HTTP calls (the client's aiohttp http_trace), and unhandled
+# errors. A probe loop measures event-loop lag. Snapshots are written to the
+# rotating logs/bot.log and shown by the admin /stats command.
 
-def has_role(user: discord.Member, role_id: str):
-    return discord.utils.get(user.roles, id=int(role_id)) is not None
+os.makedirs("logs", exist_ok=True)
+log = logging.getLogger("elura")
+log.setLevel(logging.INFO)
+_log_handler = logging.handlers.RotatingFileHandler("logs/bot.log", maxBytes=5 * 1024 * 1024, backupCount=5, encoding="utf-8")
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+log.addHandler(_log_handler)
 
-def can_use_punishments(user: discord.Member):
-    uid = str(user.id)
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LAG_PROBE_INTERVAL = 0.5
+STATS_LOG_INTERVAL = 60
 
-    # Founder bypass
-    if has_role(user, FOUNDER):
-        return True
+class Histogram:
+    """Fixed log-scale latency buckets (ms) plus persistence/HTTP totals."""
 
-    role_ids = [str(r.id) for r in user.roles]
+    __slots__ = ("counts", "n", "total", "errors", "persistence", "http")
 
-    # Tier 1 permissions
-    if any(r in role_ids for r in TIER1):
-        return True
-    # Tier 2 permissions
-    if any(r in role_ids for r in TIER2):
-        return True
-    # Tier 3 permissions
-    if any(r in role_ids for r in TIER3):
-        return True
-    # Tier 4 permissions
-    if any(r in role_ids for r in TIER4):
-        return True
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.errors = 0
+        self.persistence = 0.0
+        self.http = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.n += 1
+        self.total += ms
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th observation."""
+        target, seen = pct / 100 * self.n, 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (float("inf"),), self.counts):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0.0
+
+    def summary(self) -> dict:
+        return {
+            "count": self.n,
+            "errors": self.errors,
+            "avg_ms": round(self.total / self.n, 3) if self.n else 0.0,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "persistence_ms": round(self.persistence, 3),
+            "http_ms": round(self.http, 3)
+        }
+
+class Span:
+    """Per-invocation accumulators, reachable through current_span."""
+
+    __slots__ = ("persistence", "http")
+
+    def __init__(self):
+        self.persistence = 0.0
+        self.http = 0.0
+
+current_span = contextvars.ContextVar("current_span", default=None)
+
+class Stats:
+    def __init__(self):
+        self.handlers = {}
+        self.routes = {}
+        self.loop_lag = Histogram()
+        self.persistence_ms = 0.0
+        self.http_ms = 0.0
+        self.started = time.time()
+
+    def _histogram(self, table: dict, name: str) -> Histogram:
+        hist = table.get(name)
+        if hist is None:
+            hist = table[name] = Histogram()
+        return hist
+
+    def record(self, name: str, seconds: float, span: Span):
+        hist = self._histogram(self.handlers, name)
+        hist.observe(seconds * 1000)
+        hist.persistence += span.persistence * 1000
+        hist.http += span.http * 1000
+
+    def record_error(self, name: str):
+        self._histogram(self.handlers, name).errors += 1
+
+    def add_persistence(self, seconds: float):
+        self.persistence_ms += seconds * 1000
+        span = current_span.get()
+        if span is not None:
+            span.persistence += seconds
+
+    def add_http(self, route: str, seconds: float):
+        self.http_ms += seconds * 1000
+        self._histogram(self.routes, route).observe(seconds * 1000)
+        span = current_span.get()
+        if span is not None:
+            span.http += seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "uptime_s": round(time.time() - self.started),
+            "handlers": {name: h.summary() for name, h in self.handlers.items()},
+            "http_routes": {name: h.summary() for name, h in self.routes.items()},
+            "loop_lag_ms": {"p50": self.loop_lag.percentile(50), "p99": self.loop_lag.percentile(99)},
+            "persistence_ms": round(self.persistence_ms, 3),
+            "http_ms": round(self.http_ms, 3)
+        }
+
+stats = Stats()
+
+def instrumented(name: str, coro):
+    @functools.wraps(coro)
+    async def wrapper(*args, **kwargs):
+        span = Span()
+        token = current_span.set(span)
+        start = time.perf_counter()
+        try:
+            return await coro(*args, **kwargs)
+        except Exception:
+            stats.record_error(name)
+            log.exception("Unhandled error in %s", name)
+            raise
+        finally:
+            stats.record(name, time.perf_counter() - start, span)
+            current_span.reset(token)
+    wrapper.__instrumented__ = True
+    return wrapper
+
+def command_name(command) -> str:
+    return f"/{command.qualified_name}" if isinstance(command, app_commands.Command) else command.name
+
+def start_command(interaction: discord.Interaction):
+    """Open a span for an app command; it runs in the same task as the callback that follows."""
+    span = Span()
+    current_span.set(span)
+    interaction.extras["span"] = (span, time.perf_counter())
+
+def finish_command(interaction: discord.Interaction, command):
+    started = interaction.extras.pop("span", None)
+    if started is not None and command is not None:
+        span, start = started
+        stats.record(command_name(command), time.perf_counter() - start, span)
+
+async def _http_started(session, ctx, params):
+    ctx.start = time.perf_counter()
+
+async def _http_finished(session, ctx, params):
+    route = API_PATH.sub("", params.url.path)
+    stats.add_http(f"{params.method} {SNOWFLAKE_OR_TOKEN.sub('/{id}', route)}", time.perf_counter() - ctx.start)
+
+# Concrete IDs and interaction tokens are folded so routes aggregate like discord.py's templates
+API_PATH = re.compile(r"^/api/v\d+")
+SNOWFLAKE_OR_TOKEN = re.compile(r"/(?:\d{15,}|[\w.-]{60,})(?=/|$)")
+
+http_trace.on_request_start.append(_http_started)
+http_trace.on_request_end.append(_http_finished)
+http_trace.on_request_exception.append(_http_finished)
+
+@tasks.loop(seconds=LAG_PROBE_INTERVAL)
+async def probe_loop_lag():
+    now = time.perf_counter()
+    last = getattr(probe_loop_lag, "_last", None)
+    if last is not None:
+        stats.loop_lag.observe(max(0.0, now - last - LAG_PROBE_INTERVAL) * 1000)
+    probe_loop_lag._last = now
+
+@tasks.loop(seconds=STATS_LOG_INTERVAL)
+async def log_stats():
+    log.info("stats %s", json.dumps(stats_snapshot(), separators=(",", ":")))
+
+# ------------------------------
+# Per-shard status
+# ------------------------------
+# Each launched worker rewrites data/shards/worker-<n>.json every few
+# seconds, so /stats in any guild lists every shard of the deployment.
+
+SHARD_STATUS_DIR = "data/shards"
+SHARD_STATUS_INTERVAL = 15
+SHARD_STATUS_STALE = 3 * SHARD_STATUS_INTERVAL
+
+def local_shard_status() -> list[dict]:
+    guilds = collections.Counter(guild.shard_id for guild in bot.guilds)
+    return [
+        {
+            "shard_id": shard_id,
+            "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+            "guilds": guilds.get(shard_id, 0),
+            "worker": WORKER_ID,
+            "updated": time.time()
+        }
+        for shard_id, latency in sorted(bot.latencies)
+    ]
+
+@tasks.loop(seconds=SHARD_STATUS_INTERVAL)
+async def publish_shard_status():
+    os.makedirs(SHARD_STATUS_DIR, exist_ok=True)
+    path = os.path.join(SHARD_STATUS_DIR, f"worker-{WORKER_ID}.json")
+    await asyncio.to_thread(atomic_write_json, path, {"pid": os.getpid(), "shards": local_shard_status()}, 1, None)
+
+def shard_status() -> list[dict]:
+    """Latency and guild count per shard: ours live, other workers' from their last status file."""
+    rows = {row["shard_id"]: row for row in local_shard_status()}
+    if WORKER_ID is not None and os.path.isdir(SHARD_STATUS_DIR):
+        now = time.time()
+        for name in os.listdir(SHARD_STATUS_DIR):
+            if name == f"worker-{WORKER_ID}.json":
+                continue
+            status = read_json_generations(os.path.join(SHARD_STATUS_DIR, name), 1) or {}
+            for row in status.get("shards", []):
+                known = rows.get(row["shard_id"])
+                if known is None or known["updated"] < row["updated"]:
+                    rows[row["shard_id"]] = {**row, "stale": now - row["updated"] > SHARD_STATUS_STALE}
+    return [rows[shard_id] for shard_id in sorted(rows)]
+
+def stats_snapshot() -> dict:
+    snapshot = stats.snapshot()
+    snapshot["write_behind"] = write_behind.metrics()
+    snapshot["economy_locks"] = economy_locks.metrics()
+    snapshot["counting"] = counting.metrics()
+    snapshot["translation"] = translator.metrics()
+    snapshot["log_queue"] = log_queue.metrics()
+    snapshot["bans"] = ban_cache.metrics()
+    snapshot["member_events"] = member_events.metrics()
+    snapshot["cooldowns"] = cooldowns.metrics()
+    snapshot["guild_cache"] = guild_cache.metrics()
+    snapshot["startup"] = startup.metrics()
+    snapshot["shards"] = shard_status()
+    snapshot["storage"] = {"bytes_written": storage.bytes_written, "fsyncs": storage.fsyncs}
+    return snapshot
+
+@tree.command(name="stats", description="Show bot performance statistics (admins only).")
+@app_commands.default_permissions(administrator=True)
+async def stats_cmd(interaction: Interaction):
+    if not interaction.user.guild_permissions.administrator:
+        return await interaction.response.send_message("❌ Administrators only.", ephemeral=True)
+
+    snapshot = stats_snapshot()
+    embed = discord.Embed(title="📊 Elura Utility • Stats", color=discord.Color.blurple())
+
+    handlers = sorted(snapshot["handlers"].items(), key=lambda x: x[1]["count"], reverse=True)[:10]
+    lines = [
+        f"`{name}` ×{h['count']} • p50 {h['p50_ms']}ms • p99 {h['p99_ms']}ms"
+        f" • db {h['persistence_ms']:.0f}ms • http {h['http_ms']:.0f}ms" + (f" • ❌{h['errors']}" if h["errors"] else "")
+        for name, h in handlers
+    ]
+    embed.add_field(name="Handlers (busiest)", value="\n".join(lines)[:1024] or "No calls yet.", inline=False)
+
+    wb = snapshot["write_behind"]
+    written = sum(s["performed"] for s in wb["sections"].values())
+    avoided = sum(s["avoided"] for s in wb["sections"].values())
+    embed.add_field(
+        name="Persistence",
+        value=f"{snapshot['persistence_ms']:.0f}ms on loop • {written} records written • {avoided} coalesced • {wb['pending']} pending",
+        inline=False
+    )
+    embed.add_field(name="Discord HTTP", value=f"{snapshot['http_ms']:.0f}ms total over {len(snapshot['http_routes'])} routes", inline=False)
+    embed.add_field(
+        name="Event Loop Lag",
+        value=f"p50 {snapshot['loop_lag_ms']['p50']}ms • p99 {snapshot['loop_lag_ms']['p99']}ms",
+        inline=False
+    )
+    locks = snapshot["economy_locks"]
+    embed.add_field(name="Economy Locks", value=f"{locks['acquisitions']} acquired • {locks['contended']} contended • max wait {locks['max_wait_ms']}ms", inline=False)
+    cache = snapshot["guild_cache"]
+    embed.add_field(
+        name="Guild Cache",
+        value=f"{cache['resident_guilds']} guilds • {cache['resident_users']} users • ~{cache['estimated_mb']}/{cache['budget_mb']} MB"
+              f" • {cache['loads']} loads • {cache['evictions']} evicted • hit rate {cache['hit_rate']:.0%}",
+        inline=False
+    )
+    shards = snapshot["shards"]
+    lines = [
+        f"#{row['shard_id']} • {row['latency_ms'] if row['latency_ms'] is not None else '—'}ms • {row['guilds']} guilds"
+        + (f" • worker {row['worker']}" if row.get("worker") is not None else "")
+        + (" • ⚠️ stale" if row.get("stale") else "")
+        for row in shards
+    ]
+    embed.add_field(name=f"Shards ({len(shards)})", value="\n".join(lines)[:1024] or "Not connected.", inline=False)
+    logs = snapshot["log_queue"]
+    embed.add_field(name="Log Queue", value=f"{logs['depth']} pending • {logs['sent_embeds']} sent in {logs['sent_messages']} messages • {logs['dropped']} dropped • {logs['failed']} failed", inline=False)
+    embed.set_footer(text=f"Uptime {snapshot['uptime_s']}s • Cold start {snapshot['startup']['total_ms'] / 1000:.2f}s • Latency {round(bot.latency * 1000)}ms")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# ============================================================
+#                   PERMISSION CHECK SYSTEM
+# ============================================================
+# Each guild config carries a PermissionIndex compiled from its founder role
+# and punishment tiers: role ID → capability bitmask. A check intersects the
+# member's role IDs with the indexed roles and ORs the masks, so a member
+# always gets the highest tier any of their roles grants.
+
+PERM_WARN = 1 << 0
+PERM_WARNINGS = 1 << 1
+PERM_MUTE = 1 << 2
+PERM_KICK = 1 << 3
+PERM_BAN = 1 << 4
+PERM_UNBAN = 1 << 5
+PERM_UNWARN = 1 << 6
+PERM_ALL = (1 << 7) - 1
+
+PERMISSION_BITS = {
+    "warn": PERM_WARN,
+    "warnings": PERM_WARNINGS,
+    "mute": PERM_MUTE,
+    "kick": PERM_KICK,
+    "ban": PERM_BAN,
+    "unban": PERM_UNBAN,
+    "unwarn": PERM_UNWARN
+}
+
+# Tiers in ascending order; unwarn stays founder-only
+TIER_CAPABILITIES = {
+    "tier1": PERM_WARN,
+    "tier2": PERM_WARN | PERM_WARNINGS,
+    "tier3": PERM_WARN | PERM_WARNINGS | PERM_MUTE,
+    "tier4": PERM_WARN | PERM_WARNINGS | PERM_MUTE | PERM_KICK | PERM_BAN | PERM_UNBAN
+}
+TIER_NAMES = ("tier1", "tier2", "tier3", "tier4", "FOUNDER")
+
+class PermissionIndex:
+    """Immutable role → capability/tier lookup for one guild."""
+    __slots__ = ("masks", "ranks", "roles")
+
+    def __init__(self, founder_role, tiers: dict, guild_id: int = None):
+        masks, ranks = {}, {}
+        for rank, tier in enumerate(TIER_NAMES[:-1]):
+            for value in tiers.get(tier, []):
+                role_id = self._role_id(value, guild_id, tier)
+                if role_id is None:
+                    continue
+                masks[role_id] = masks.get(role_id, 0) | TIER_CAPABILITIES[tier]
+                ranks[role_id] = max(ranks.get(role_id, rank), rank)
+        founder = self._role_id(founder_role, guild_id, "founder_role") if founder_role else None
+        if founder is not None:
+            masks[founder] = PERM_ALL
+            ranks[founder] = len(TIER_NAMES) - 1
+        self.masks = masks
+        self.ranks = ranks
+        self.roles = frozenset(masks)
+
+    @staticmethod
+    def _role_id(value, guild_id, setting: str):
+        """A configured role as an int; typos are logged and ignored like any role nobody has."""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            log.warning("guild %s: ignoring invalid role ID %r in %s", guild_id, value, setting)
+            return None
+
+    def _matched(self, member: discord.Member):
+        return self.roles.intersection([role.id for role in member.roles])
+
+    def capabilities(self, member: discord.Member) -> int:
+        mask = 0
+        for role_id in self._matched(member):
+            mask |= self.masks[role_id]
+        return mask
+
+    def tier(self, member: discord.Member):
+        """Highest tier name across the member's roles ("FOUNDER", "tier4", ...) or None."""
+        matched = self._matched(member)
+        if not matched:
+            return None
+        return TIER_NAMES[max(self.ranks[role_id] for role_id in matched)]
+
+def permissions_for(guild: discord.Guild) -> PermissionIndex:
+    return guild_configs.get(guild.id).permissions
+
+def has_role(user: discord.Member, role_id: str):
+    return discord.utils.get(user.roles, id=int(role_id)) is not None
 
-    return False
+def is_founder(user: discord.Member) -> bool:
+    return permissions_for(user.guild).tier(user) == "FOUNDER"
+
+def can_use_punishments(user: discord.Member):
+    return permissions_for(user.guild).capabilities(user) != 0
 
 # ============================================================
 #                UNIVERSAL RESPONSE / CLEAN EMBEDS
@@ -204,7 +1738,7 @@ def clean_embed(title=None, description=None, color=0x1e466f):
         description=description,
         color=color
     )
-    embed.timestamp = datetime.datetime.utcnow()
+    embed.timestamp = cached_utcnow()
     return embed
 
 def error_embed(msg):
@@ -221,6 +1755,93 @@ def success_embed(msg):
         color=0x2ECC71
     )
 
+# ============================================================
+#                  EMBED & MESSAGE TEMPLATES
+# ============================================================
+# Hot-path embeds (welcome/leave, moderation actions) are rendered from
+# prototypes built once: render() copies the prototype's fixed slots onto a
+# fresh Embed and fills in only the per-event parts. Guild message templates
+# are validated once (at /setup, or when a config is loaded) and rendered
+# with format_map. Timestamps come from a per-second clock cache.
+
+TEMPLATE_PLACEHOLDERS = ("usermention", "username", "guildname", "membercount")
+
+class MessageTemplate:
+    """A guild message such as welcome_message, checked to use only known placeholders."""
+    __slots__ = ("text", "fields")
+
+    def __init__(self, text: str):
+        fields = []
+        try:
+            parsed = list(string.Formatter().parse(text))
+        except ValueError as e:
+            raise ValueError(f"Malformed template: {e}")
+        for _, field, spec, conversion in parsed:
+            if field is None:
+                continue
+            if field not in TEMPLATE_PLACEHOLDERS:
+                allowed = ", ".join(f"{{{name}}}" for name in TEMPLATE_PLACEHOLDERS)
+                raise ValueError(f"Unknown placeholder {{{field}}}. Allowed: {allowed}")
+            if spec or conversion:
+                raise ValueError(f"Placeholder {{{field}}} cannot have a format spec or conversion")
+            fields.append(field)
+        self.text = text
+        self.fields = frozenset(fields)
+
+    def render(self, values: dict) -> str:
+        return self.text.format_map(values)
+
+class EmbedTemplate:
+    """Embed recipe: fixed title/colour/field names, variable everything else."""
+    __slots__ = ("title", "color", "field_names", "inline")
+
+    def __init__(self, title: str = None, color=None, field_names: tuple = (), inline: bool = True):
+        self.title = title
+        self.color = color
+        self.field_names = tuple(field_names)
+        self.inline = inline
+
+    def render(self, description: str = None, values: tuple = (), footer: str = None,
+               thumbnail: str = None, timestamp: datetime.datetime = None) -> discord.Embed:
+        embed = discord.Embed(title=self.title, color=self.color, description=description, timestamp=timestamp)
+        for name, value in zip(self.field_names, values):
+            embed.add_field(name=name, value=value, inline=self.inline)
+        if footer is not None:
+            embed.set_footer(text=footer)
+        if thumbnail is not None:
+            embed.set_thumbnail(url=thumbnail)
+        return embed
+
+_clock = {"second": None, "now": None, "minute": None, "text": None}
+
+def cached_utcnow() -> datetime.datetime:
+    """Aware UTC now, rebuilt at most once per second."""
+    second = int(time.time())
+    if second != _clock["second"]:
+        _clock["second"] = second
+        _clock["now"] = datetime.datetime.fromtimestamp(second, datetime.timezone.utc)
+    return _clock["now"]
+
+def now_utc():
+    minute = int(time.time()) // 60
+    if minute != _clock["minute"]:
+        _clock["minute"] = minute
+        _clock["text"] = cached_utcnow().strftime("%Y-%m-%d • %H:%M UTC")
+    return _clock["text"]
+
+# Moderation action embeds (shared by the command reply and the log entry)
+MOD_EMBEDS = {
+    "warn": EmbedTemplate("⚠️ Warning Issued", discord.Color.yellow(), ("User", "Reason", "Case ID"), inline=False),
+    "mute": EmbedTemplate("🔇 User Muted", discord.Color.orange(), ("User", "Duration", "Reason", "Case ID")),
+    "kick": EmbedTemplate("👢 User Kicked", discord.Color.red(), ("User", "Reason", "Case ID")),
+    "ban": EmbedTemplate("⛔ User Banned", discord.Color.dark_red(), ("User", "Reason", "Case ID")),
+    "unban": EmbedTemplate("✅ User Unbanned", discord.Color.green(), ("User", "Reason", "Case ID")),
+    "unwarn": EmbedTemplate("🗑 Case Removed", discord.Color.green(), ("Case ID", "Action", "User"))
+}
+
+def mod_embed(action: str, *values, moderator, verb: str = "Issued") -> discord.Embed:
+    return MOD_EMBEDS[action].render(values=values, footer=f"{verb} by {moderator} • {now_utc()}")
+
 # ============================================================
 #                LOAD JSON UTILITIES AS HELPERS
 # ============================================================
@@ -232,7 +1853,7 @@ async def get_punishments():
 async def save_punishments(punishment_data):
     data = load_alliance()
     data["punishments"] = punishment_data
-    save_alliance(data)
+    save_alliance(data, ("punishments",))
 
 async def get_economy():
     data = load_alliance()
@@ -241,7 +1862,7 @@ async def get_economy():
 async def save_economy(economy_data):
     data = load_alliance()
     data["economy"] = economy_data
-    save_alliance(data)
+    save_alliance(data, ("economy",))
 
 async def get_counting():
     data = load_alliance()
@@ -250,7 +1871,7 @@ async def get_counting():
 async def save_counting(count_data):
     data = load_alliance()
     data["counting"] = count_data
-    save_alliance(data)
+    save_alliance(data, ("counting",))
 # ============================================================
 #                     ECONOMY HELPER LOGIC
 # ============================================================
@@ -267,8 +1888,7 @@ def generate_rob_amount():
 
 async def next_case_number():
     punish = await get_punishments()
-    existing = [int(x.replace("case_", "")) for x in punish.keys()] or [0]
-    return max(existing) + 1
+    return punish.get("last_case_id", 0) + 1
 
 # ============================================================
 #                           /SETUP
@@ -283,7 +1903,7 @@ class SetupView(discord.ui.View):
             "welcome_channel": None,
             "leave_channel": None,
             "count_channel": None,
-            "log_channel": None,
+            "logs_channel": None,
             "economy_channel": None
         }
 
@@ -359,7 +1979,7 @@ class SetupView(discord.ui.View):
             timeout=60
         )
         if msg.channel_mentions:
-            self.result["log_channel"] = msg.channel_mentions[0].id
+            self.result["logs_channel"] = msg.channel_mentions[0].id
             await interaction.followup.send(
                 f"Logs channel set to {msg.channel_mentions[0].mention}", ephemeral=True
             )
@@ -394,14 +2014,31 @@ class SetupView(discord.ui.View):
 # ============================================================
 
 @tree.command(name="setup", description="Run the full Elura Utility setup wizard.")
-async def setup_cmd(interaction: Interaction):
+@app_commands.describe(
+    welcome_message="Optional welcome text; placeholders: {usermention} {username} {guildname} {membercount}",
+    leave_message="Optional leave text; same placeholders as the welcome message"
+)
+async def setup_cmd(interaction: Interaction, welcome_message: str = None, leave_message: str = None):
 
-    if not has_role(interaction.user, FOUNDER):
+    if not is_founder(interaction.user):
         return await interaction.response.send_message(
             embed=error_embed("Only founders can run /setup."),
             ephemeral=True
         )
 
+    # Templates are validated up front so a bad placeholder never reaches a join event
+    messages = {"welcome_message": welcome_message, "leave_message": leave_message}
+    for key, text in messages.items():
+        if text is None:
+            continue
+        try:
+            MessageTemplate(text)
+        except ValueError as e:
+            return await interaction.response.send_message(
+                embed=error_embed(f"Invalid `{key}`: {e}"),
+                ephemeral=True
+            )
+
     v = SetupView(interaction.user)
 
     embed = clean_embed(
@@ -424,16 +2061,8 @@ async def setup_cmd(interaction: Interaction):
     # Wait for setup to finish
     await v.wait()
 
-    # Load current alliance.json
-    current = load_alliance()
-
-    # Update guild settings
-    for key, value in v.result.items():
-        if value is not None:
-            current["guild_settings"][key] = value
-
-    # Save updated alliance.json
-    save_alliance(current)
+    # Save this guild's settings; its cached config is rebuilt on next use
+    guild_configs.update(interaction.guild.id, {**v.result, **messages})
 
     await interaction.followup.send(
         embed=success_embed("Setup complete! Elura Utility is now fully configured."),
@@ -444,71 +2073,295 @@ async def setup_cmd(interaction: Interaction):
 #                   WELCOME / LEAVE SYSTEM
 # ============================================================
 
-WELCOME_COLOR = int(alliance["guild_settings"].get("welcome_color", "#1e466f")[1:], 16)
-LEAVE_COLOR = int(alliance["guild_settings"].get("leave_color", "#ff3b3b")[1:], 16)
-
-@bot.event
-async def on_member_join(member: discord.Member):
-    try:
-        channel_id = alliance["guild_settings"].get("welcome_channel")
-        if not channel_id:
-            return
-
-        channel = member.guild.get_channel(int(channel_id))
-        if not channel:
-            return
-
-        embed = discord.Embed(
-            title=f"Welcome to {member.guild.name}!",
-            description=alliance["guild_settings"]["welcome_message"].format(
-                usermention=member.mention,
-                guildname=member.guild.name
-            ),
-            color=WELCOME_COLOR
+# Joins and leaves go through per-guild buffers drained by one task each.
+# Normally every member gets their own embed; when the guild's rate over the
+# last MEMBER_RATE_WINDOW seconds exceeds its digest rate (guild setting
+# "join_digest_rate"), the buffer collects for a window and sends one digest
+# ("37 members joined in the last 10s") instead. Avatars are only resolved
+# when an individual embed is actually built.
+
+MEMBER_RATE_WINDOW = 10.0       # seconds
+MEMBER_EVENT_RATE = 1.0         # sends per second per welcome/leave channel
+MEMBER_EVENT_BURST = 5
+
+class MemberRateDetector:
+    """Sliding-window join/leave counts per guild, for any subsystem to query."""
+
+    def __init__(self, window: float = MEMBER_RATE_WINDOW):
+        self.window = window
+        self._events: dict[tuple, collections.deque] = {}
+        self._next_sweep = 0.0
+
+    def _trim(self, key: tuple, events: collections.deque, now: float):
+        cutoff = now - self.window
+        while events and events[0] <= cutoff:
+            events.popleft()
+        if not events:
+            del self._events[key]
+
+    def _sweep(self, now: float):
+        """Drop the windows of guilds that have gone quiet (once per window)."""
+        for key, events in list(self._events.items()):
+            self._trim(key, events, now)
+        self._next_sweep = now + self.window
+
+    def record(self, guild_id: int, kind: str = "join"):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+        key = (guild_id, kind)
+        events = self._events.get(key)
+        if events is None:
+            events = self._events[key] = collections.deque()
+        events.append(now)
+        self._trim(key, events, now)
+
+    def rate(self, guild_id: int, kind: str = "join") -> int:
+        """Events of `kind` in the guild during the last `window` seconds."""
+        key = (guild_id, kind)
+        events = self._events.get(key)
+        if not events:
+            return 0
+        self._trim(key, events, time.monotonic())
+        return len(events)
+
+    def is_raid(self, guild_id: int) -> bool:
+        return self.rate(guild_id, "join") > guild_configs.get(guild_id).digest_rate
+
+member_rate = MemberRateDetector()
+
+class MemberEventBuffer:
+    __slots__ = ("guild", "kind", "pending", "worker")
+
+    def __init__(self, guild: discord.Guild, kind: str):
+        self.guild = guild
+        self.kind = kind
+        self.pending = collections.deque()   # (member, member_count, unix time)
+        self.worker = None
+
+def member_event_embed(kind: str, config: GuildConfig, member: discord.Member, member_count: int, at: float) -> discord.Embed:
+    guild_name = member.guild.name
+    values = {"usermention": member.mention, "username": member.name, "guildname": guild_name, "membercount": member_count}
+    if kind == "join":
+        return config.welcome_embed(guild_name).render(
+            description=config.welcome_template.render(values),
+            footer=f"Member #{member_count}",
+            thumbnail=member.display_avatar.url,
+            timestamp=cached_utcnow()
         )
+    return config.leave_embed.render(
+        description=config.leave_template.render(values),
+        thumbnail=member.display_avatar.url,
+        timestamp=cached_utcnow()
+    )
 
-        embed.set_thumbnail(url=member.display_avatar.url)
-        embed.set_footer(text=f"Member #{member.guild.member_count}")
-        embed.timestamp = datetime.datetime.utcnow()
+def member_digest_embed(kind: str, config: GuildConfig, batch: list) -> discord.Embed:
+    verb, color = ("joined", config.welcome_color) if kind == "join" else ("left", config.leave_color)
+    span = max(1, round(time.time() - batch[0][2]))
+    embed = discord.Embed(
+        title=f"{'📥' if kind == 'join' else '📤'} {len(batch)} members {verb} in the last {span}s",
+        description=", ".join(member.mention for member, _, _ in batch)[:4000],
+        color=color
+    )
+    if kind == "join":
+        embed.set_footer(text=f"Member #{batch[-1][1]}")
+    embed.timestamp = datetime.datetime.fromtimestamp(batch[-1][2], datetime.timezone.utc)
+    return embed
 
-        await channel.send(embed=embed)
+class MemberEventPipeline:
+    def __init__(self):
+        self.buffers: dict[tuple, MemberEventBuffer] = {}
+        self.buckets: dict[int, TokenBucket] = {}
+        self.sent_single = 0
+        self.sent_digests = 0
+        self.digested = 0
+
+    def _channel(self, guild: discord.Guild, kind: str):
+        config = guild_configs.get(guild.id)
+        channel_id = config.welcome_channel if kind == "join" else config.leave_channel
+        return config, guild.get_channel(channel_id) if channel_id else None
+
+    def push(self, member: discord.Member, kind: str):
+        guild = member.guild
+        member_rate.record(guild.id, kind)
+        if self._channel(guild, kind)[1] is None:
+            return
+        buffer = self.buffers.get((guild.id, kind))
+        if buffer is None:
+            buffer = self.buffers[(guild.id, kind)] = MemberEventBuffer(guild, kind)
+        buffer.pending.append((member, guild.member_count, time.time()))
+        if buffer.worker is None:
+            buffer.worker = asyncio.create_task(self._drain(buffer))
+
+    async def _drain(self, buffer: MemberEventBuffer):
+        try:
+            while buffer.pending:
+                config, channel = self._channel(buffer.guild, buffer.kind)
+                if channel is None:
+                    buffer.pending.clear()
+                    break
+
+                if member_rate.rate(buffer.guild.id, buffer.kind) > config.digest_rate or len(buffer.pending) > config.digest_rate:
+                    # Burst: let the window fill up, then send it as one digest
+                    await asyncio.sleep(MEMBER_RATE_WINDOW)
+                    batch = list(buffer.pending)
+                    buffer.pending.clear()
+                    embed = member_digest_embed(buffer.kind, config, batch)
+                    self.sent_digests += 1
+                    self.digested += len(batch)
+                else:
+                    embed = member_event_embed(buffer.kind, config, *buffer.pending.popleft())
+                    self.sent_single += 1
+
+                bucket = self.buckets.get(channel.id)
+                if bucket is None:
+                    bucket = self.buckets[channel.id] = TokenBucket(MEMBER_EVENT_RATE, MEMBER_EVENT_BURST)
+                await bucket.acquire()
+                try:
+                    await channel.send(embed=embed)
+                except discord.HTTPException:
+                    stats.record_error(f"member_{buffer.kind}")
+                    log.exception("Welcome/leave send failed")
+        finally:
+            buffer.worker = None
+
+    def metrics(self) -> dict:
+        return {
+            "backlog": sum(len(buffer.pending) for buffer in self.buffers.values()),
+            "sent_single": self.sent_single,
+            "sent_digests": self.sent_digests,
+            "digested_members": self.digested
+        }
 
-    except Exception as e:
-        print(f"Welcome error: {e}")
+member_events = MemberEventPipeline()
 
+@bot.event
+async def on_member_join(member: discord.Member):
+    member_events.push(member, "join")
 
 @bot.event
 async def on_member_remove(member: discord.Member):
-    try:
-        channel_id = alliance["guild_settings"].get("leave_channel")
-        if not channel_id:
-            return
+    member_events.push(member, "leave")
 
-        channel = member.guild.get_channel(int(channel_id))
-        if not channel:
-            return
 
-        embed = discord.Embed(
-            title="Member Left",
-            description=alliance["guild_settings"]["leave_message"].format(
-                usermention=member.mention,
-                guildname=member.guild.name
-            ),
-            color=LEAVE_COLOR
-        )
+# ============================================================
+#                         COUNTING SYSTEM
+# ============================================================
+# Counting runs entirely in memory: each guild's count channel has a small
+# state object that is updated synchronously in on_message (so messages
+# dispatched in the same tick are judged strictly in arrival order),
+# checkpointed into alliance["counting"] every few seconds, and an outbox that
+# sends reactions/replies in order at a pace the reaction route tolerates.
 
-        embed.set_thumbnail(url=member.display_avatar.url)
-        embed.timestamp = datetime.datetime.utcnow()
+COUNTING_CHECKPOINT_INTERVAL = 5.0  # seconds between state checkpoints
+REACTION_INTERVAL = 0.25            # Discord allows ~1 reaction per 0.25s per channel
+REACTION_BACKLOG = 200              # beyond this, ✅ reactions are dropped (❌ never are)
 
-        await channel.send(embed=embed)
+class CountingChannel:
+    """Live count of one guild's count channel; persisted under alliance["counting"][guild_id]."""
+    __slots__ = ("guild_id", "channel_id", "current", "last_user", "outbox", "worker", "next_send")
 
-    except Exception as e:
-        print(f"Leave error: {e}")
+    def __init__(self, guild_id: int, channel_id: int, current: int = 0, last_user: int | None = None):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.current = current
+        self.last_user = last_user
+        self.outbox = collections.deque()
+        self.worker = None
+        self.next_send = 0.0
+
+class CountingEngine:
+    def __init__(self):
+        self.guilds: dict[int, CountingChannel] = {}    # keyed like the saved state
+        self._dirty: set[CountingChannel] = set()
+        self.counted = 0
+        self.ruined = 0
+        self.dropped = 0
+
+    def channel(self, guild_id: int, channel_id: int) -> CountingChannel:
+        state = self.guilds.get(guild_id)
+        if state is None:
+            saved = alliance.get("counting", {}).get(str(guild_id)) or {}
+            last_user = saved.get("last_user")
+            state = self.guilds[guild_id] = CountingChannel(
+                guild_id, channel_id, int(saved.get("current", 0)), int(last_user) if last_user else None
+            )
+        elif state.channel_id != channel_id:
+            # /setup moved the count channel: the guild's count carries over (queued reactions still drain)
+            state.channel_id = channel_id
+        return state
+
+    def handle(self, message: discord.Message, num: int):
+        """Judge one number. Never awaits, so ordering is exactly dispatch order."""
+        state = self.channel(message.guild.id, message.channel.id)
+        author_id = message.author.id
+
+        if author_id == state.last_user or num != state.current + 1:
+            state.current = 0
+            state.last_user = None
+            self.ruined += 1
+            state.outbox.append((message, "❌", num))
+        else:
+            state.current = num
+            state.last_user = author_id
+            self.counted += 1
+            if len(state.outbox) < REACTION_BACKLOG:
+                state.outbox.append((message, "✅", None))
+            else:
+                self.dropped += 1
+
+        self._dirty.add(state)
+        if state.worker is None:
+            state.worker = asyncio.create_task(self._drain(state))
+
+    async def _drain(self, state: CountingChannel):
+        loop = asyncio.get_running_loop()
+        try:
+            while state.outbox:
+                message, emoji, ruined_at = state.outbox.popleft()
+                wait = state.next_send - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                state.next_send = loop.time() + REACTION_INTERVAL
+                try:
+                    await message.add_reaction(emoji)
+                    if ruined_at is not None:
+                        await message.reply(
+                            f"{message.author.mention} RUINED IT AT **{ruined_at}**!! Next number is **1**. **Wrong number.**"
+                        )
+                except discord.HTTPException as e:
+                    log.warning("counting reaction failed in %s: %s", state.channel_id, e)
+        finally:
+            state.worker = None
+
+    def checkpoint(self):
+        """Copy changed channel states into the alliance and mark them dirty."""
+        if not self._dirty:
+            return
+        count_data = alliance.setdefault("counting", {})
+        for state in self._dirty:
+            guild_id = str(state.guild_id)
+            count_data[guild_id] = {
+                "current": state.current,
+                "last_user": str(state.last_user) if state.last_user else None
+            }
+            save_alliance(alliance, ("counting", guild_id))
+        self._dirty.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "channels": len(self.guilds),
+            "counted": self.counted,
+            "ruined": self.ruined,
+            "dropped_reactions": self.dropped,
+            "backlog": sum(len(state.outbox) for state in self.guilds.values())
+        }
 
+counting = CountingEngine()
 
-# ============================================================
-#                         COUNTING SYSTEM
-# ============================================================
+@tasks.loop(seconds=COUNTING_CHECKPOINT_INTERVAL)
+async def checkpoint_counting():
+    counting.checkpoint()
 
 @bot.event
 async def on_message(message: discord.Message):
@@ -516,60 +2369,16 @@ async def on_message(message: discord.Message):
     if message.author.bot:
         return
 
-    count_channel_id = alliance["guild_settings"].get("count_channel")
-    if not count_channel_id or message.channel.id != int(count_channel_id):
+    if message.guild is None or message.channel.id != guild_configs.get(message.guild.id).count_channel:
         return await bot.process_commands(message)
 
-    # Load counting section from alliance.json
-    count_data = alliance.get("counting", {})
-    guild_id = str(message.guild.id)
-
-    if guild_id not in count_data:
-        count_data[guild_id] = {
-            "current": 0,
-            "last_user": None
-        }
-
-    current = count_data[guild_id]["current"]
-    last_user = count_data[guild_id]["last_user"]
-
     # Check if message is a number
     try:
         num = int(message.content)
-    except:
-        return await bot.process_commands(message)
-
-    # Same user as last → wrong
-    if last_user == str(message.author.id):
-        await message.add_reaction("❌")
-        await message.reply(
-            f"{message.author.mention} RUINED IT AT **{num}**!! Next number is **1**. **Wrong number.**"
-        )
-        count_data[guild_id]["current"] = 0
-        count_data[guild_id]["last_user"] = None
-        alliance["counting"] = count_data
-        save_alliance(alliance)
+    except ValueError:
         return await bot.process_commands(message)
 
-    # Correct number
-    if num == current + 1:
-        await message.add_reaction("✅")
-        count_data[guild_id]["current"] = num
-        count_data[guild_id]["last_user"] = str(message.author.id)
-        alliance["counting"] = count_data
-        save_alliance(alliance)
-
-    else:
-        # Wrong number → reset
-        await message.add_reaction("❌")
-        await message.reply(
-            f"{message.author.mention} RUINED IT AT **{num}**!! Next number is **1**. **Wrong number.**"
-        )
-        count_data[guild_id]["current"] = 0
-        count_data[guild_id]["last_user"] = None
-        alliance["counting"] = count_data
-        save_alliance(alliance)
-
+    counting.handle(message, num)
     await bot.process_commands(message)
     
 # ===========================================
@@ -586,39 +2395,20 @@ import datetime
 def new_case_id():
     return str(uuid.uuid4())[:8].upper()
 
-def now_utc():
-    return datetime.datetime.utcnow().strftime("%Y-%m-%d • %H:%M UTC")
-
 def get_user_tier(member: discord.Member):
-    for role in member.roles:
-        if str(role.id) in TIER1 + TIER2 + TIER3 + TIER4:
-            return str(role.id)
-    if str(FOUNDER) in [str(r.id) for r in member.roles]:
-        return "FOUNDER"
-    return None
+    return permissions_for(member.guild).tier(member)
 
 def has_permission(member: discord.Member, command: str):
-    tier = get_user_tier(member)
-    if tier is None:
-        return False
-    if tier == "FOUNDER":
-        return True
-    role_commands = {}
-    for t, roles in zip(["tier1","tier2","tier3","tier4"], [TIER1,TIER2,TIER3,TIER4]):
-        for r in roles:
-            role_commands[str(r)] = {
-                "tier1": ["warn"],
-                "tier2": ["warn","warnings"],
-                "tier3": ["warn","warnings","mute"],
-                "tier4": ["warn","warnings","mute","kick","ban","unban"]
-            }[t]
-    return command in role_commands.get(tier, [])
+    bit = PERMISSION_BITS.get(command, PERM_ALL)
+    return permissions_for(member.guild).capabilities(member) & bit == bit
 
 async def log_action(guild: discord.Guild, embed: discord.Embed):
-    if LOGS_CHANNEL:
-        channel = guild.get_channel(int(LOGS_CHANNEL))
+    """Queue a moderation log; delivery happens in the background (see LogQueue)."""
+    logs_channel = guild_configs.get(guild.id).logs_channel
+    if logs_channel:
+        channel = guild.get_channel(logs_channel)
         if channel:
-            await channel.send(embed=embed)
+            log_queue.put(channel, embed)
 
 # ------------------------------
 # /warn
@@ -634,12 +2424,6 @@ async def warn_cmd(interaction: discord.Interaction, member: discord.Member, rea
     case_id = new_case_id()
     guild_id = str(interaction.guild.id)
 
-    # Initialize punishments
-    if "punishments" not in alliance:
-        alliance["punishments"] = {"cases": [], "last_case_id": 0}
-    if guild_id not in alliance["punishments"]:
-        alliance["punishments"]["cases"] = []
-
     # Add case
     data = {
         "case": case_id,
@@ -649,15 +2433,9 @@ async def warn_cmd(interaction: discord.Interaction, member: discord.Member, rea
         "reason": reason,
         "timestamp": now_utc()
     }
-    alliance["punishments"]["cases"].append(data)
-    alliance["punishments"]["last_case_id"] += 1
-    save_alliance(alliance)
+    await add_case(guild_id, data)
 
-    embed = discord.Embed(title="⚠️ Warning Issued", color=discord.Color.yellow())
-    embed.add_field(name="User", value=member.mention, inline=False)
-    embed.add_field(name="Reason", value=reason, inline=False)
-    embed.add_field(name="Case ID", value=case_id, inline=False)
-    embed.set_footer(text=f"Issued by {interaction.user} • {now_utc()}")
+    embed = mod_embed("warn", member.mention, reason, case_id, moderator=interaction.user)
 
     await interaction.response.send_message(embed=embed)
     await log_action(interaction.guild, embed)
@@ -669,13 +2447,13 @@ async def warn_cmd(interaction: discord.Interaction, member: discord.Member, rea
 @app_commands.describe(member="User to check")
 async def warnings_cmd(interaction: discord.Interaction, member: discord.Member):
     guild_id = str(interaction.guild.id)
-    all_cases = alliance.get("punishments", {}).get("cases", [])
-    user_cases = [c for c in all_cases if c["user"] == member.id]
+    user_cases = await get_user_cases(guild_id, member.id)
 
-    warn_count = sum(1 for c in user_cases if c["type"] == "warn")
-    mute_count = sum(1 for c in user_cases if c["type"] == "mute")
-    kick_count = sum(1 for c in user_cases if c["type"] == "kick")
-    ban_count = sum(1 for c in user_cases if c["type"] == "ban")
+    totals = alliance["punishments"]["cases"].counts(guild_id, member.id)
+    warn_count = totals.get("warn", 0)
+    mute_count = totals.get("mute", 0)
+    kick_count = totals.get("kick", 0)
+    ban_count = totals.get("ban", 0)
 
     embed = discord.Embed(title="📄 Punishment History", color=discord.Color.blurple())
     embed.set_thumbnail(url=member.display_avatar.url)
@@ -707,19 +2485,14 @@ class ConfirmUnwarn(discord.ui.View):
         if interaction.user.id != self.staff.id:
             return await interaction.response.send_message("❌ Not your confirmation.", ephemeral=True)
 
-        guild_cases = alliance.get("punishments", {}).get("cases", [])
-        case_data = next((c for c in guild_cases if c["case"] == self.case_id), None)
+        case_data = remove_case(self.guild_id, self.case_id)
         if not case_data:
             return await interaction.response.edit_message(content="❌ Case already removed.", view=None)
 
-        guild_cases.remove(case_data)
-        save_alliance(alliance)
-
-        embed = discord.Embed(title="🗑 Case Removed", color=discord.Color.green())
-        embed.add_field(name="Case ID", value=self.case_id)
-        embed.add_field(name="Action", value=case_data["type"].capitalize())
-        embed.add_field(name="User", value=f"<@{case_data['user']}>")
-        embed.set_footer(text=f"Removed by {interaction.user} • {now_utc()}")
+        embed = mod_embed(
+            "unwarn", self.case_id, case_data["type"].capitalize(), f"<@{case_data['user']}>",
+            moderator=interaction.user, verb="Removed"
+        )
         await interaction.response.edit_message(content="", embed=embed, view=None)
         await log_action(interaction.guild, embed)
 
@@ -734,8 +2507,7 @@ async def unwarn_cmd(interaction: discord.Interaction, case_id: str):
         return await interaction.response.send_message("❌ You lack permission.", ephemeral=True)
 
     guild_id = str(interaction.guild.id)
-    guild_cases = alliance.get("punishments", {}).get("cases", [])
-    if not any(c["case"] == case_id for c in guild_cases):
+    if alliance["punishments"]["cases"].get(case_id, guild_id) is None:
         return await interaction.response.send_message("❌ Invalid case ID.", ephemeral=True)
 
     view = ConfirmUnwarn(interaction.user, guild_id, case_id)
@@ -745,6 +2517,100 @@ async def unwarn_cmd(interaction: discord.Interaction, case_id: str):
 # SECTION 6 — PART 2: MODERATION COMMANDS (All-in-One JSON)
 # ===========================================
 
+# ------------------------------
+# Mute expiry scheduler
+# ------------------------------
+PENDING_MUTES_PATH = ("punishments", "pending_mutes")
+MUTE_BATCH_WINDOW = 1.0   # expiries this close together are handled in one pass
+
+class MuteScheduler:
+    """A single task sleeping until the next mute expiry.
+
+    Pending expiries live in alliance["punishments"]["pending_mutes"] as
+    case_id -> [expires_at, guild_id, user_id] next to the cases, with a
+    min-heap of (expires_at, case_id) in memory. They are reloaded when the
+    bot starts, so mutes survive restarts without one task per mute.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def _pending(self) -> dict:
+        return alliance["punishments"].setdefault("pending_mutes", {})
+
+    def schedule(self, case_id: str, guild_id: str, user_id: int, expires_at: float):
+        self._pending()[case_id] = [expires_at, guild_id, user_id]
+        save_alliance(alliance, PENDING_MUTES_PATH + (case_id,))
+        heapq.heappush(self._heap, (expires_at, case_id))
+        if self._heap[0][1] == case_id:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        await bot.wait_until_ready()
+        # Other shard processes expire their own guilds' mutes
+        self._heap = [(entry[0], case_id) for case_id, entry in self._pending().items() if owns_guild(entry[1])]
+        heapq.heapify(self._heap)
+
+        while True:
+            self._wakeup.clear()
+            delay = self._heap[0][0] - time.time() if self._heap else None
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Pop everything due within the batch window in one go
+            due = []
+            horizon = time.time() + MUTE_BATCH_WINDOW
+            while self._heap and self._heap[0][0] <= horizon:
+                expires_at, case_id = heapq.heappop(self._heap)
+                entry = self._pending().pop(case_id, None)
+                if entry is not None:
+                    save_alliance(alliance, PENDING_MUTES_PATH + (case_id,))
+                    due.append(entry)
+
+            try:
+                await self._expire(due)
+            except Exception:
+                stats.record_error("mute_scheduler")
+                log.exception("Unmute error")
+
+    async def _expire(self, due):
+        by_guild = {}
+        for _, guild_id, user_id in due:
+            by_guild.setdefault(guild_id, []).append(user_id)
+
+        for guild_id, user_ids in by_guild.items():
+            guild = bot.get_guild(int(guild_id))
+            mute_role = discord.utils.get(guild.roles, name="Muted") if guild else None
+            if mute_role is None:
+                continue
+
+            members = [guild.get_member(int(user_id)) for user_id in user_ids]
+            members = [m for m in members if m and mute_role in m.roles]
+            results = await asyncio.gather(
+                *(m.remove_roles(mute_role, reason="Mute duration expired") for m in members),
+                return_exceptions=True
+            )
+            unmuted = [m for m, result in zip(members, results) if not isinstance(result, Exception)]
+            if not unmuted:
+                continue
+
+            embed_unmute = discord.Embed(title="✅ User Unmuted", color=discord.Color.green())
+            embed_unmute.add_field(name="User" if len(unmuted) == 1 else "Users", value="\n".join(m.mention for m in unmuted)[:1024])
+            embed_unmute.add_field(name="Reason", value="Mute duration expired")
+            await log_action(guild, embed_unmute)
+
+mute_scheduler = MuteScheduler()
+
 # ------------------------------
 # /mute
 # ------------------------------
@@ -765,9 +2631,7 @@ async def mute_cmd(interaction: discord.Interaction, member: discord.Member, min
     # Record punishment in alliance.json
     case_id = new_case_id()
     guild_id = str(interaction.guild.id)
-    if "punishments" not in alliance:
-        alliance["punishments"] = {"cases": [], "last_case_id": 0}
-    alliance["punishments"]["cases"].append({
+    await add_case(guild_id, {
         "case": case_id,
         "type": "mute",
         "user": member.id,
@@ -776,28 +2640,13 @@ async def mute_cmd(interaction: discord.Interaction, member: discord.Member, min
         "timestamp": now_utc(),
         "duration": minutes
     })
-    alliance["punishments"]["last_case_id"] += 1
-    save_alliance(alliance)
-
-    embed = discord.Embed(title="🔇 User Muted", color=discord.Color.orange())
-    embed.add_field(name="User", value=member.mention)
-    embed.add_field(name="Duration", value=f"{minutes} minutes")
-    embed.add_field(name="Reason", value=reason)
-    embed.add_field(name="Case ID", value=case_id)
-    embed.set_footer(text=f"Issued by {interaction.user} • {now_utc()}")
+
+    embed = mod_embed("mute", member.mention, f"{minutes} minutes", reason, case_id, moderator=interaction.user)
     await interaction.response.send_message(embed=embed)
     await log_action(interaction.guild, embed)
 
     # Automatically unmute after duration
-    async def unmute_after():
-        await asyncio.sleep(minutes * 60)
-        if mute_role in member.roles:
-            await member.remove_roles(mute_role, reason="Mute duration expired")
-            embed_unmute = discord.Embed(title="✅ User Unmuted", color=discord.Color.green())
-            embed_unmute.add_field(name="User", value=member.mention)
-            embed_unmute.add_field(name="Reason", value="Mute duration expired")
-            await log_action(interaction.guild, embed_unmute)
-    asyncio.create_task(unmute_after())
+    mute_scheduler.schedule(case_id, guild_id, member.id, time.time() + minutes * 60)
 
 # ------------------------------
 # /kick
@@ -818,9 +2667,7 @@ async def kick_cmd(interaction: discord.Interaction, member: discord.Member, rea
     # Record punishment
     case_id = new_case_id()
     guild_id = str(interaction.guild.id)
-    if "punishments" not in alliance:
-        alliance["punishments"] = {"cases": [], "last_case_id": 0}
-    alliance["punishments"]["cases"].append({
+    await add_case(guild_id, {
         "case": case_id,
         "type": "kick",
         "user": member.id,
@@ -828,14 +2675,8 @@ async def kick_cmd(interaction: discord.Interaction, member: discord.Member, rea
         "reason": reason,
         "timestamp": now_utc()
     })
-    alliance["punishments"]["last_case_id"] += 1
-    save_alliance(alliance)
-
-    embed = discord.Embed(title="👢 User Kicked", color=discord.Color.red())
-    embed.add_field(name="User", value=member.mention)
-    embed.add_field(name="Reason", value=reason)
-    embed.add_field(name="Case ID", value=case_id)
-    embed.set_footer(text=f"Issued by {interaction.user} • {now_utc()}")
+
+    embed = mod_embed("kick", member.mention, reason, case_id, moderator=interaction.user)
     await interaction.response.send_message(embed=embed)
     await log_action(interaction.guild, embed)
 
@@ -858,9 +2699,7 @@ async def ban_cmd(interaction: discord.Interaction, member: discord.Member, reas
     # Record punishment
     case_id = new_case_id()
     guild_id = str(interaction.guild.id)
-    if "punishments" not in alliance:
-        alliance["punishments"] = {"cases": [], "last_case_id": 0}
-    alliance["punishments"]["cases"].append({
+    await add_case(guild_id, {
         "case": case_id,
         "type": "ban",
         "user": member.id,
@@ -868,17 +2707,130 @@ async def ban_cmd(interaction: discord.Interaction, member: discord.Member, reas
         "reason": reason,
         "timestamp": now_utc()
     })
-    alliance["punishments"]["last_case_id"] += 1
-    save_alliance(alliance)
-
-    embed = discord.Embed(title="⛔ User Banned", color=discord.Color.dark_red())
-    embed.add_field(name="User", value=member.mention)
-    embed.add_field(name="Reason", value=reason)
-    embed.add_field(name="Case ID", value=case_id)
-    embed.set_footer(text=f"Issued by {interaction.user} • {now_utc()}")
+
+    embed = mod_embed("ban", member.mention, reason, case_id, moderator=interaction.user)
     await interaction.response.send_message(embed=embed)
     await log_action(interaction.guild, embed)
 
+# ------------------------------
+# Ban cache
+# ------------------------------
+# Per-guild ban list, warmed in the background the first time a guild is
+# asked about and kept current from on_member_ban/on_member_unban. Until a
+# guild is fully warmed, misses fall back to a single fetch_ban lookup.
+
+class GuildBans:
+    __slots__ = ("users", "complete", "warming", "unbanned")
+
+    def __init__(self):
+        self.users: dict[int, discord.abc.User] = {}
+        self.complete = False
+        self.warming = False
+        self.unbanned: set[int] = set()   # unbans seen while the list is paging in
+
+class BanCache:
+    def __init__(self):
+        self.guilds: dict[int, GuildBans] = {}
+        self.lookups = 0
+        self.hits = 0
+        self.fetches = 0
+        self._warming: dict[int, asyncio.Task] = {}
+
+    def _guild(self, guild_id: int) -> GuildBans:
+        bans = self.guilds.get(guild_id)
+        if bans is None:
+            bans = self.guilds[guild_id] = GuildBans()
+        return bans
+
+    def warm(self, guild: discord.Guild):
+        bans = self._guild(guild.id)
+        if not (bans.complete or bans.warming):
+            bans.warming = True
+            task = self._warming[guild.id] = asyncio.create_task(self._warm(guild, bans))
+            task.add_done_callback(lambda t: self._warmed(guild.id, t))
+
+    def _warmed(self, guild_id: int, task: asyncio.Task):
+        self._warming.pop(guild_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            log.warning("ban list warm-up crashed for guild %s", guild_id, exc_info=task.exception())
+
+    def close(self):
+        for task in list(self._warming.values()):
+            task.cancel()
+
+    async def _warm(self, guild: discord.Guild, bans: GuildBans):
+        try:
+            async for entry in guild.bans(limit=None):
+                if entry.user.id not in bans.unbanned:
+                    bans.users.setdefault(entry.user.id, entry.user)
+            bans.complete = True
+        except discord.HTTPException as e:
+            log.warning("ban list warm-up failed for guild %s: %s", guild.id, e)
+        finally:
+            bans.warming = False
+            bans.unbanned.clear()
+
+    def is_banned(self, guild_id: int, user_id: int):
+        """True/False from the cache, or None if the guild is not warmed and the ID is unknown."""
+        bans = self.guilds.get(guild_id)
+        if bans is None:
+            return None
+        if user_id in bans.users:
+            return True
+        return False if bans.complete else None
+
+    async def get(self, guild: discord.Guild, user_id: int):
+        """The banned user, or None if `user_id` is not banned in `guild`."""
+        self.lookups += 1
+        bans = self._guild(guild.id)
+        self.warm(guild)
+        user = bans.users.get(user_id)
+        if user is not None or bans.complete:
+            self.hits += 1
+            return user
+
+        self.fetches += 1
+        try:
+            entry = await guild.fetch_ban(discord.Object(id=user_id))
+        except discord.NotFound:
+            return None
+        if user_id not in bans.unbanned:
+            bans.users[user_id] = entry.user
+        return entry.user
+
+    def add(self, guild_id: int, user: discord.abc.User):
+        bans = self.guilds.get(guild_id)
+        if bans is not None:
+            bans.users[user.id] = user
+            bans.unbanned.discard(user.id)
+
+    def discard(self, guild_id: int, user_id: int):
+        bans = self.guilds.get(guild_id)
+        if bans is not None:
+            bans.users.pop(user_id, None)
+            if bans.warming:
+                bans.unbanned.add(user_id)
+
+    def metrics(self) -> dict:
+        return {
+            "guilds": len(self.guilds),
+            "warmed": sum(1 for bans in self.guilds.values() if bans.complete),
+            "entries": sum(len(bans.users) for bans in self.guilds.values()),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "fetches": self.fetches
+        }
+
+ban_cache = BanCache()
+
+@bot.event
+async def on_member_ban(guild: discord.Guild, user: discord.abc.User):
+    ban_cache.add(guild.id, user)
+
+@bot.event
+async def on_member_unban(guild: discord.Guild, user: discord.abc.User):
+    ban_cache.discard(guild.id, user.id)
+
 # ------------------------------
 # /unban
 # ------------------------------
@@ -889,25 +2841,20 @@ async def unban_cmd(interaction: discord.Interaction, user_id: str, reason: str)
         return await interaction.response.send_message("❌ You lack permission to unban.", ephemeral=True)
 
     guild = interaction.guild
-    try:
-        user = await guild.fetch_member(int(user_id))
-        return await interaction.response.send_message("❌ This user is not banned.", ephemeral=True)
-    except:
-        pass  # User not in guild, proceed to unban
+    if not user_id.strip().isdigit():
+        return await interaction.response.send_message("❌ Invalid user ID.", ephemeral=True)
 
-    bans = await guild.bans()
-    target = next((b.user for b in bans if str(b.user.id) == str(user_id)), None)
+    target = await ban_cache.get(guild, int(user_id))
     if target is None:
         return await interaction.response.send_message("❌ User ID not found in ban list.", ephemeral=True)
 
     await guild.unban(target, reason=reason)
+    ban_cache.discard(guild.id, target.id)
 
     # Record unban
     case_id = new_case_id()
     guild_id = str(interaction.guild.id)
-    if "punishments" not in alliance:
-        alliance["punishments"] = {"cases": [], "last_case_id": 0}
-    alliance["punishments"]["cases"].append({
+    await add_case(guild_id, {
         "case": case_id,
         "type": "unban",
         "user": target.id,
@@ -915,17 +2862,256 @@ async def unban_cmd(interaction: discord.Interaction, user_id: str, reason: str)
         "reason": reason,
         "timestamp": now_utc()
     })
-    alliance["punishments"]["last_case_id"] += 1
-    save_alliance(alliance)
-
-    embed = discord.Embed(title="✅ User Unbanned", color=discord.Color.green())
-    embed.add_field(name="User", value=f"{target} (`{target.id}`)")
-    embed.add_field(name="Reason", value=reason)
-    embed.add_field(name="Case ID", value=case_id)
-    embed.set_footer(text=f"Issued by {interaction.user} • {now_utc()}")
+
+    embed = mod_embed("unban", f"{target} (`{target.id}`)", reason, case_id, moderator=interaction.user)
     await interaction.response.send_message(embed=embed)
     await log_action(interaction.guild, embed)
     
+# ------------------------------
+# /bulk ban | kick | mute
+# ------------------------------
+# Raid tooling. Targets come from an ID/mention list, a "joined in the last N
+# minutes" window and/or a regex on names (all given filters must match).
+# After a confirmation, the Discord calls run concurrently under a semaphore
+# (bans go through bulk_ban, 200 users per call), every case is recorded in a
+# single storage write, one summary embed is logged, and the original
+# response is edited with progress while the run is going.
+
+BULK_MAX_TARGETS = 1000
+BULK_CONCURRENCY = 8
+BULK_BAN_CHUNK = 200               # bulk_ban API limit
+BULK_PROGRESS_INTERVAL = 2.0       # seconds between progress edits
+BULK_REGEX_MAX = 200
+
+bulk_group = app_commands.Group(name="bulk", description="Mass moderation for raids.")
+
+def parse_user_ids(text: str) -> list[int]:
+    """IDs from any mix of raw IDs, <@mentions>, commas and spaces (order kept, deduplicated)."""
+    return list(dict.fromkeys(int(match) for match in re.findall(r"\d{15,20}", text or "")))
+
+def select_bulk_targets(interaction: discord.Interaction, ids: str, joined_within: int, name_regex: str, members_only: bool):
+    """Return (targets, error). Non-members are only kept (as discord.Object) for bans by ID."""
+    guild = interaction.guild
+    pattern = None
+    if name_regex:
+        if len(name_regex) > BULK_REGEX_MAX:
+            return [], f"Regex is too long (max {BULK_REGEX_MAX} characters)."
+        try:
+            pattern = re.compile(name_regex, re.IGNORECASE)
+        except re.error as e:
+            return [], f"Invalid regex: {e}"
+    if not (ids or joined_within or pattern):
+        return [], "Give at least one of `ids`, `joined_within` or `name_regex`."
+
+    if ids:
+        candidates = []
+        for user_id in parse_user_ids(ids):
+            member = guild.get_member(user_id)
+            if member is not None:
+                candidates.append(member)
+            elif not members_only and not (joined_within or pattern):
+                candidates.append(discord.Object(id=user_id))
+    else:
+        candidates = list(guild.members)
+
+    if joined_within:
+        cutoff = discord.utils.utcnow() - datetime.timedelta(minutes=joined_within)
+        candidates = [m for m in candidates if getattr(m, "joined_at", None) and m.joined_at >= cutoff]
+    if pattern:
+        candidates = [m for m in candidates if pattern.search(m.name) or pattern.search(m.display_name)]
+
+    # Never sweep up the invoker, the bot itself or staff
+    me = guild.me.id if guild.me else None
+    targets = [
+        t for t in candidates
+        if t.id not in (interaction.user.id, me)
+        and not (isinstance(t, discord.Member) and (t.bot or can_use_punishments(t)))
+    ]
+    if not targets:
+        return [], "No members matched."
+    if len(targets) > BULK_MAX_TARGETS:
+        return [], f"{len(targets)} members matched; the limit is {BULK_MAX_TARGETS}. Narrow the filters."
+    return targets, None
+
+class ConfirmBulk(discord.ui.View):
+    def __init__(self, staff):
+        super().__init__(timeout=60)
+        self.staff = staff
+        self.confirmed = False
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.staff.id:
+            await interaction.response.send_message("❌ Not your confirmation.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="Confirm", style=discord.ButtonStyle.danger)
+    async def yes(self, interaction: discord.Interaction, button):
+        self.confirmed = True
+        await interaction.response.defer()
+        self.stop()
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.secondary)
+    async def no(self, interaction: discord.Interaction, button):
+        await interaction.response.defer()
+        self.stop()
+
+def bulk_progress_embed(action: str, total: int, done: int, failed: int, finished: bool = False) -> discord.Embed:
+    embed = clean_embed(
+        title=f"{'✅' if finished else '⏳'} Bulk {action} {'finished' if finished else 'in progress'}",
+        description=f"**{done}** succeeded • **{failed}** failed • **{total - done - failed}** remaining of **{total}**"
+    )
+    return embed
+
+async def run_bulk(interaction: discord.Interaction, action: str, targets: list, reason: str, duration: int = None):
+    guild = interaction.guild
+    done, failed = [], []   # targets / (target, error)
+
+    mute_role = None
+    if action == "mute":
+        mute_role = discord.utils.get(guild.roles, name="Muted")
+        if not mute_role:
+            mute_role = await guild.create_role(name="Muted", reason="Auto-created by Elura Utility")
+
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+    audit_reason = f"Bulk {action} by {interaction.user}: {reason}"[:512]
+
+    async def apply(batch):
+        async with semaphore:
+            try:
+                if action == "ban":
+                    result = await guild.bulk_ban(batch, reason=audit_reason, delete_message_seconds=0)
+                    banned = {user.id for user in result.banned}
+                    for target in batch:
+                        if target.id in banned:
+                            done.append(target)
+                        else:
+                            failed.append((target, "not banned"))
+                elif action == "kick":
+                    await guild.kick(batch[0], reason=audit_reason)
+                    done.append(batch[0])
+                else:
+                    await batch[0].add_roles(mute_role, reason=audit_reason)
+                    done.append(batch[0])
+            except discord.HTTPException as e:
+                failed.extend((target, e.text or str(e.status)) for target in batch)
+
+    if action == "ban":
+        batches = [targets[i:i + BULK_BAN_CHUNK] for i in range(0, len(targets), BULK_BAN_CHUNK)]
+    else:
+        batches = [[target] for target in targets]
+
+    work = asyncio.ensure_future(asyncio.gather(*(apply(batch) for batch in batches)))
+    while not work.done():
+        await asyncio.wait([work], timeout=BULK_PROGRESS_INTERVAL)
+        if not work.done():
+            try:
+                await interaction.edit_original_response(
+                    embed=bulk_progress_embed(action, len(targets), len(done), len(failed)), view=None
+                )
+            except discord.HTTPException:
+                pass
+    await work
+
+    # One storage transaction for every case
+    timestamp = now_utc()
+    cases = []
+    for target in done:
+        case = {
+            "case": new_case_id(),
+            "type": action,
+            "user": target.id,
+            "moderator": interaction.user.id,
+            "reason": reason,
+            "timestamp": timestamp
+        }
+        if duration:
+            case["duration"] = duration
+        cases.append(case)
+    await add_cases(str(guild.id), cases)
+    if action == "mute":
+        expires_at = time.time() + duration * 60
+        for case in cases:
+            mute_scheduler.schedule(case["case"], str(guild.id), case["user"], expires_at)
+
+    # One summary log
+    summary = bulk_progress_embed(action, len(targets), len(done), len(failed), finished=True)
+    summary.add_field(name="Reason", value=reason[:1024], inline=False)
+    if duration:
+        summary.add_field(name="Duration", value=f"{duration} minutes", inline=False)
+    if done:
+        summary.add_field(name="Affected", value=", ".join(f"<@{t.id}>" for t in done)[:1024], inline=False)
+    if failed:
+        summary.add_field(
+            name="Failed",
+            value="\n".join(f"`{t.id}`: {error}" for t, error in failed)[:1024],
+            inline=False
+        )
+    if cases:
+        summary.add_field(name="Cases", value=f"`{cases[0]['case']}` … `{cases[-1]['case']}` ({len(cases)})", inline=False)
+    summary.set_footer(text=f"Issued by {interaction.user} • {timestamp}")
+    await interaction.edit_original_response(embed=summary, view=None)
+    await log_action(guild, summary)
+
+async def bulk_command(interaction: discord.Interaction, action: str, reason: str, ids: str, joined_within: int,
+                       name_regex: str, duration: int = None):
+    if not has_permission(interaction.user, action):
+        return await interaction.response.send_message(f"❌ You lack permission to {action}.", ephemeral=True)
+
+    targets, error = select_bulk_targets(interaction, ids, joined_within, name_regex, members_only=action != "ban")
+    if error:
+        return await interaction.response.send_message(f"❌ {error}", ephemeral=True)
+
+    preview = clean_embed(
+        title=f"⚠️ Bulk {action}: {len(targets)} target(s)",
+        description=", ".join(f"<@{t.id}>" for t in targets)[:4000]
+    )
+    preview.add_field(name="Reason", value=reason[:1024], inline=False)
+    view = ConfirmBulk(interaction.user)
+    await interaction.response.send_message(embed=preview, view=view)
+    await view.wait()
+    if not view.confirmed:
+        return await interaction.edit_original_response(content="❌ Cancelled.", embed=None, view=None)
+
+    await interaction.edit_original_response(embed=bulk_progress_embed(action, len(targets), 0, 0), view=None)
+    await run_bulk(interaction, action, targets, reason, duration)
+
+@bulk_group.command(name="ban", description="Ban many users by ID list, join window or name regex.")
+@app_commands.describe(
+    reason="Reason for the bans",
+    ids="User IDs or mentions, separated by spaces or commas",
+    joined_within="Only members who joined in the last N minutes",
+    name_regex="Only members whose username or display name matches this regex"
+)
+async def bulk_ban_cmd(interaction: discord.Interaction, reason: str, ids: str = None,
+                       joined_within: app_commands.Range[int, 1, 10080] = None, name_regex: str = None):
+    await bulk_command(interaction, "ban", reason, ids, joined_within, name_regex)
+
+@bulk_group.command(name="kick", description="Kick many members by ID list, join window or name regex.")
+@app_commands.describe(
+    reason="Reason for the kicks",
+    ids="User IDs or mentions, separated by spaces or commas",
+    joined_within="Only members who joined in the last N minutes",
+    name_regex="Only members whose username or display name matches this regex"
+)
+async def bulk_kick_cmd(interaction: discord.Interaction, reason: str, ids: str = None,
+                        joined_within: app_commands.Range[int, 1, 10080] = None, name_regex: str = None):
+    await bulk_command(interaction, "kick", reason, ids, joined_within, name_regex)
+
+@bulk_group.command(name="mute", description="Mute many members by ID list, join window or name regex.")
+@app_commands.describe(
+    minutes="Duration in minutes",
+    reason="Reason for the mutes",
+    ids="User IDs or mentions, separated by spaces or commas",
+    joined_within="Only members who joined in the last N minutes",
+    name_regex="Only members whose username or display name matches this regex"
+)
+async def bulk_mute_cmd(interaction: discord.Interaction, minutes: app_commands.Range[int, 1, 40320], reason: str,
+                        ids: str = None, joined_within: app_commands.Range[int, 1, 10080] = None, name_regex: str = None):
+    await bulk_command(interaction, "mute", reason, ids, joined_within, name_regex, duration=minutes)
+
+tree.add_command(bulk_group)
+    
  # ===========================================
 # SECTION 6 — PART 3: LOGGING & UTILITIES (All-in-One)
 # ===========================================
@@ -933,73 +3119,305 @@ async def unban_cmd(interaction: discord.Interaction, user_id: str, reason: str)
 # ------------------------------
 # Centralized log embed function
 # ------------------------------
-async def create_log_embed(action_type: str, member: discord.Member, moderator: discord.Member, reason: str, case_id: str, duration: int = None):
-    colors = {
-        "warn": discord.Color.yellow(),
-        "mute": discord.Color.orange(),
-        "kick": discord.Color.red(),
-        "ban": discord.Color.dark_red(),
-        "unban": discord.Color.green()
-    }
-    title_icons = {
-        "warn": "⚠️ Warning Issued",
-        "mute": "🔇 User Muted",
-        "kick": "👢 User Kicked",
-        "ban": "⛔ User Banned",
-        "unban": "✅ User Unbanned"
-    }
-
-    embed = discord.Embed(
-        title=title_icons.get(action_type, "Action Log"),
-        color=colors.get(action_type, discord.Color.blurple())
-    )
+LOG_EMBED_FIELDS = ("User", "Moderator", "Reason", "Case ID", "Duration")
+LOG_EMBEDS = {
+    action: EmbedTemplate(template.title, template.color, LOG_EMBED_FIELDS, inline=False)
+    for action, template in MOD_EMBEDS.items() if action != "unwarn"
+}
+LOG_EMBED_DEFAULT = EmbedTemplate("Action Log", discord.Color.blurple(), LOG_EMBED_FIELDS, inline=False)
 
-    embed.add_field(name="User", value=f"{member.mention} (`{member.id}`)", inline=False)
-    embed.add_field(name="Moderator", value=f"{moderator.mention} (`{moderator.id}`)", inline=False)
-    embed.add_field(name="Reason", value=reason, inline=False)
-    embed.add_field(name="Case ID", value=case_id, inline=False)
+async def create_log_embed(action_type: str, member: discord.Member, moderator: discord.Member, reason: str, case_id: str, duration: int = None):
+    values = (f"{member.mention} (`{member.id}`)", f"{moderator.mention} (`{moderator.id}`)", reason, case_id)
     if duration:
-        embed.add_field(name="Duration", value=f"{duration} minutes", inline=False)
-
-    embed.set_footer(text=f"Timestamp: {now_utc()}")
-    return embed
+        values += (f"{duration} minutes",)
+    return LOG_EMBEDS.get(action_type, LOG_EMBED_DEFAULT).render(values=values, footer=f"Timestamp: {now_utc()}")
 
 # ------------------------------
 # Centralized punishment JSON functions
 # ------------------------------
+class CaseStore:
+    """Punishment cases with hash indexes, persisted as the plain case list.
+
+    Cases are kept in insertion order keyed by case ID, with indexes by
+    guild, by (guild_id, user_id) and by type, plus running per-member counts
+    by type. Adding and removing a case is O(1). Legacy cases without a
+    guild_id are indexed under guild None and match every guild.
+    deepcopy() returns the plain list, so the storage layer keeps writing
+    the original alliances.json layout.
+    """
+
+    def __init__(self, cases=()):
+        self._cases = {}
+        self._by_guild = {}
+        self._by_member = {}
+        self._by_type = {}
+        self._counts = {}
+        for case in cases:
+            self.append(case)
+
+    @staticmethod
+    def _guild(guild_id):
+        return str(guild_id) if guild_id is not None else None
+
+    def _member(self, case: dict):
+        return (self._guild(case.get("guild_id")), int(case["user"]))
+
+    def append(self, case: dict):
+        case_id = case["case"]
+        if case_id in self._cases:
+            self.pop(case_id)
+        self._cases[case_id] = case
+
+        member = self._member(case)
+        self._by_guild.setdefault(member[0], {})[case_id] = case
+        self._by_member.setdefault(member, {})[case_id] = case
+        self._by_type.setdefault(case["type"], {})[case_id] = case
+        counts = self._counts.setdefault(member, {})
+        counts[case["type"]] = counts.get(case["type"], 0) + 1
+
+    def pop(self, case_id: str, default=None):
+        case = self._cases.pop(case_id, None)
+        if case is None:
+            return default
+
+        member = self._member(case)
+        for index, key in ((self._by_guild, member[0]), (self._by_member, member), (self._by_type, case["type"])):
+            bucket = index[key]
+            del bucket[case_id]
+            if not bucket:
+                del index[key]
+        counts = self._counts[member]
+        counts[case["type"]] -= 1
+        if not counts[case["type"]]:
+            del counts[case["type"]]
+            if not counts:
+                del self._counts[member]
+        return case
+
+    def get(self, case_id: str, guild_id=None):
+        """Case by ID; with guild_id, only if it belongs to that guild (or is legacy)."""
+        case = self._cases.get(case_id)
+        if case is None or guild_id is None:
+            return case
+        return case if self._guild(case.get("guild_id")) in (str(guild_id), None) else None
+
+    def for_guild(self, guild_id):
+        return list(self._by_guild.get(self._guild(guild_id), {}).values())
+
+    def for_member(self, guild_id, user_id: int):
+        legacy = self._by_member.get((None, int(user_id)), {})
+        scoped = self._by_member.get((self._guild(guild_id), int(user_id)), {})
+        return list(legacy.values()) + list(scoped.values())
+
+    def of_type(self, case_type: str):
+        return list(self._by_type.get(case_type, {}).values())
+
+    def counts(self, guild_id, user_id: int) -> dict:
+        """{type: n} for a member in O(1)."""
+        totals = dict(self._counts.get((None, int(user_id)), {}))
+        for case_type, n in self._counts.get((self._guild(guild_id), int(user_id)), {}).items():
+            totals[case_type] = totals.get(case_type, 0) + n
+        return totals
+
+    def __contains__(self, case_id):
+        return case_id in self._cases
+
+    def __iter__(self):
+        return iter(self._cases.values())
+
+    def __len__(self):
+        return len(self._cases)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(list(self._cases.values()), memo)
+
 def get_guild_cases(guild_id: str):
     """Return list of cases for a guild from alliance.json"""
     if "punishments" not in alliance:
-        alliance["punishments"] = {"cases": [], "last_case_id": 0}
-    return [c for c in alliance["punishments"]["cases"] if str(c.get("guild_id")) == guild_id]
+        alliance["punishments"] = {"cases": CaseStore(), "last_case_id": 0}
+    return alliance["punishments"]["cases"].for_guild(guild_id)
+
+CASES_PATH = ("punishments", "cases")
 
-def add_case(guild_id: str, case_data: dict):
+LAST_CASE_PATH = ("punishments", "last_case_id")
+
+async def add_case(guild_id: str, case_data: dict):
     """Add a punishment case to alliance.json"""
     if "punishments" not in alliance:
-        alliance["punishments"] = {"cases": [], "last_case_id": 0}
+        alliance["punishments"] = {"cases": CaseStore(), "last_case_id": 0}
     case_data["guild_id"] = guild_id
     alliance["punishments"]["cases"].append(case_data)
-    alliance["punishments"]["last_case_id"] += 1
-    save_alliance(alliance)
+    write_behind.append(CASES_PATH, case_data)
+    await storage.allocate(LAST_CASE_PATH)
+
+async def add_cases(guild_id: str, cases: list):
+    """Add many cases at once; they reach storage as a single write (one transaction), then bump the counter once"""
+    if not cases:
+        return
+    store = alliance["punishments"]["cases"]
+    for case_data in cases:
+        case_data["guild_id"] = guild_id
+        store.append(case_data)
+
+    write_behind.flush()  # keep earlier buffered changes ordered before this batch
+    storage.write([{"op": "append", "path": list(CASES_PATH), "value": case_data} for case_data in cases])
+    await storage.allocate(LAST_CASE_PATH, len(cases))
 
 def remove_case(guild_id: str, case_id: str):
     """Remove a punishment case by ID from alliance.json"""
-    guild_cases = [c for c in alliance["punishments"]["cases"] if str(c.get("guild_id")) == guild_id]
-    case = next((c for c in guild_cases if c["case"] == case_id), None)
-    if case:
-        alliance["punishments"]["cases"].remove(case)
-        save_alliance(alliance)
-        return case
-    return None
+    cases = alliance["punishments"]["cases"]
+    if cases.get(case_id, guild_id) is None:
+        return None
+    write_behind.remove(CASES_PATH, "case", case_id)
+    return cases.pop(case_id)
+
+async def get_user_cases(guild_id: str, user_id: int):
+    """Return a member's cases via the storage backend's indexed lookup"""
+    start = time.perf_counter()
+    write_behind.flush()  # make pending cases visible to the backend
+    cases = await storage.user_cases(guild_id, user_id)
+    stats.add_persistence(time.perf_counter() - start)
+    return cases
+
+# ------------------------------
+# Outbound log queue
+# ------------------------------
+# log_action only enqueues. Each logs channel has its own FIFO drained by one
+# task that packs up to 10 embeds (and at most 6000 characters) per message,
+# waits on a token bucket for that channel's send route, and retries failed
+# sends with exponential backoff. Past LOG_QUEUE_LIMIT the oldest entries are
+# dropped and counted.
+
+LOG_BATCH_SIZE = 10             # Discord's embeds-per-message limit
+LOG_BATCH_CHARS = 6000          # Discord's total embed text limit per message
+LOG_QUEUE_LIMIT = 1000          # pending embeds per channel
+LOG_LINGER = 0.25               # seconds to let a burst accumulate before the first send
+LOG_ROUTE_RATE = 1.0            # sends per second per channel route (5 / 5s)
+LOG_ROUTE_BURST = 5
+LOG_MAX_ATTEMPTS = 5
+LOG_BACKOFF_BASE = 1.0
+LOG_BACKOFF_MAX = 30.0
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class LogChannelQueue:
+    __slots__ = ("channel", "pending", "worker")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.pending = collections.deque()
+        self.worker = None
+
+class LogQueue:
+    def __init__(self):
+        self.channels: dict[int, LogChannelQueue] = {}
+        self.buckets: dict[str, TokenBucket] = {}
+        self.queued = 0
+        self.dropped = 0
+        self.sent_messages = 0
+        self.sent_embeds = 0
+        self.retries = 0
+        self.failed = 0
+
+    def put(self, channel, embed: discord.Embed):
+        queue = self.channels.get(channel.id)
+        if queue is None:
+            queue = self.channels[channel.id] = LogChannelQueue(channel)
+        queue.channel = channel
+        if len(queue.pending) >= LOG_QUEUE_LIMIT:
+            queue.pending.popleft()
+            self.dropped += 1
+        queue.pending.append(embed)
+        self.queued += 1
+        if queue.worker is None:
+            queue.worker = asyncio.create_task(self._drain(queue))
+
+    def _next_batch(self, queue: LogChannelQueue) -> list:
+        batch, chars = [], 0
+        while queue.pending and len(batch) < LOG_BATCH_SIZE:
+            size = len(queue.pending[0])
+            if batch and chars + size > LOG_BATCH_CHARS:
+                break
+            batch.append(queue.pending.popleft())
+            chars += size
+        return batch
+
+    async def _drain(self, queue: LogChannelQueue):
+        route = f"POST /channels/{queue.channel.id}/messages"
+        bucket = self.buckets.get(route)
+        if bucket is None:
+            bucket = self.buckets[route] = TokenBucket(LOG_ROUTE_RATE, LOG_ROUTE_BURST)
+        try:
+            await asyncio.sleep(LOG_LINGER)
+            while queue.pending:
+                await self._send(queue.channel, bucket, self._next_batch(queue))
+        finally:
+            queue.worker = None
+
+    async def _send(self, channel, bucket: TokenBucket, batch: list):
+        for attempt in range(LOG_MAX_ATTEMPTS):
+            await bucket.acquire()
+            try:
+                await channel.send(embeds=batch)
+                self.sent_messages += 1
+                self.sent_embeds += len(batch)
+                return
+            except (discord.Forbidden, discord.NotFound) as e:
+                log.warning("log channel %s unusable, dropping %d embeds: %s", channel.id, len(batch), e)
+                break
+            except (discord.HTTPException, OSError) as e:
+                self.retries += 1
+                delay = min(LOG_BACKOFF_MAX, LOG_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+                log.warning("log send to %s failed (attempt %d), retrying in %.1fs: %s", channel.id, attempt + 1, delay, e)
+                await asyncio.sleep(delay)
+        self.failed += len(batch)
+
+    async def drain(self, timeout: float = 5.0):
+        """Wait (bounded) for queued logs to go out, e.g. on shutdown."""
+        workers = [q.worker for q in self.channels.values() if q.worker is not None]
+        if workers:
+            await asyncio.wait(workers, timeout=timeout)
+
+    def metrics(self) -> dict:
+        depths = [len(q.pending) for q in self.channels.values()]
+        return {
+            "depth": sum(depths),
+            "max_channel_depth": max(depths, default=0),
+            "queued": self.queued,
+            "dropped": self.dropped,
+            "sent_messages": self.sent_messages,
+            "sent_embeds": self.sent_embeds,
+            "retries": self.retries,
+            "failed": self.failed
+        }
+
+log_queue = LogQueue()
 
 # ------------------------------
 # Integration Notes
 # ------------------------------
 # 1. All moderation commands (/warn, /mute, /kick, /ban, /unban) now:
-#    - Use `add_case()` to save in alliance.json
+#    - Use `await add_case()` to save in alliance.json
 #    - Use `remove_case()` to remove
 #    - Use `create_log_embed()` for embeds
-#    - Call `await log_action(guild, embed)` to send log
+#    - Call `await log_action(guild, embed)` to queue a log (never waits on Discord)
 #
 # 2. Permissions handled via `has_permission()`
 #
@@ -1019,22 +3437,609 @@ import discord
 
 alliance_file = "data/alliances.json"
 
-# Load or create alliances.json
-if os.path.exists(alliance_file):
-    with open(alliance_file, "r") as f:
-        alliance = json.load(f)
-else:
-    alliance = {}
+# ------------------------------
+# Account records
+# ------------------------------
+# Economy users are Account objects (__slots__) in per-guild AccountTables
+# keyed by int user ID instead of {"wallet": .., "bank": ..} dicts under string
+# keys. Both still behave like the old dicts (str or int keys, item access),
+# and deep-copying returns the plain JSON layout, so the storage engine logs
+# and snapshots exactly what it did before.
+
+ACCOUNT_FIELDS = ("wallet", "bank")
+
+class Account:
+    __slots__ = ("wallet", "bank", "extra")
+
+    def __init__(self, wallet=0, bank=0, extra: dict = None):
+        self.wallet = wallet
+        self.bank = bank
+        self.extra = extra      # any other keys (cooldowns, ...) or None
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Account":
+        extra = {k: v for k, v in data.items() if k not in ACCOUNT_FIELDS}
+        return cls(data.get("wallet", 0), data.get("bank", 0), extra or None)
+
+    def to_json(self) -> dict:
+        data = {"wallet": self.wallet, "bank": self.bank}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __getitem__(self, key):
+        if key == "wallet":
+            return self.wallet
+        if key == "bank":
+            return self.bank
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in ACCOUNT_FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return key in ACCOUNT_FIELDS or (self.extra is not None and key in self.extra)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
 
-def save_alliance(data):
-    with open(alliance_file, "w") as f:
-        json.dump(data, f, indent=4)
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.to_json(), memo)
 
-def get_user_data(guild_id, user_id):
-    """Return or create user economy data inside alliances.json"""
-    guild_data = alliance.setdefault(str(guild_id), {})
-    user_data = guild_data.setdefault(str(user_id), {"wallet": 0, "bank": 0})
-    return user_data
+    def __repr__(self):
+        return f"Account({self.to_json()!r})"
+
+class AccountTable(dict):
+    """One guild's accounts: int user ID → Account. str keys are accepted everywhere."""
+    __slots__ = ()
+
+    def __init__(self, data: dict = None):
+        super().__init__()
+        if data:
+            from_json = Account.from_json
+            dict.update(self, ((int(user_id), value if isinstance(value, Account) else from_json(value))
+                               for user_id, value in data.items()))
+
+    def __getitem__(self, user_id):
+        return dict.__getitem__(self, int(user_id))
+
+    def __setitem__(self, user_id, value):
+        dict.__setitem__(self, int(user_id), value if isinstance(value, Account) else Account.from_json(value))
+
+    def __delitem__(self, user_id):
+        dict.__delitem__(self, int(user_id))
+
+    def __contains__(self, user_id):
+        try:
+            return dict.__contains__(self, int(user_id))
+        except (TypeError, ValueError):
+            return False
+
+    def get(self, user_id, default=None):
+        return dict.get(self, int(user_id), default)
+
+    def setdefault(self, user_id, default=None):
+        account = dict.get(self, int(user_id))
+        if account is None:
+            self[user_id] = default if default is not None else Account()
+            account = dict.__getitem__(self, int(user_id))
+        return account
+
+    def pop(self, user_id, *default):
+        return dict.pop(self, int(user_id), *default)
+
+    def __deepcopy__(self, memo):
+        return {str(user_id): copy.deepcopy(account, memo) for user_id, account in self.items()}
+
+# Storage backend: "json" (snapshot + write-ahead log) or "sqlite"
+load_dotenv()
+STORAGE_BACKEND = os.getenv("ELURA_STORAGE", "json")
+SQLITE_FILE = os.getenv("ELURA_SQLITE_FILE", "data/alliances.db")
+
+# Opened by open_storage(): the bot process only, never the launcher or migrate-sqlite
+storage = None
+write_behind = None
+
+# Write-behind / durability settings (optional "storage" block in alliances.json)
+STORAGE_SETTINGS = {}
+FLUSH_INTERVAL = 2.0
+FLUSH_THRESHOLD = 500
+GUILD_CACHE_MB = 512
+
+def open_storage():
+    """Load (or create) the live alliances.json document and apply its settings."""
+    global storage, alliance, write_behind, guild_cache
+    global STORAGE_SETTINGS, FLUSH_INTERVAL, FLUSH_THRESHOLD, GUILD_CACHE_MB, HELP_CATEGORIES
+    if STORAGE_BACKEND == "sqlite":
+        storage = SQLiteStorage(SQLITE_FILE, owns_guild if SHARD_IDS is not None else None)
+    else:
+        storage = AllianceStorage(alliance_file)
+    alliance = storage.load()
+    startup.mark(f"{storage.path} ({STORAGE_BACKEND})")
+
+    # Index punishment cases in memory (same list layout on disk)
+    punishments = alliance.setdefault("punishments", {"cases": [], "last_case_id": 0})
+    punishments.setdefault("last_case_id", 0)
+    punishments["cases"] = CaseStore(punishments.get("cases", []))
+    startup.mark("case indexes")
+
+    STORAGE_SETTINGS = alliance.get("storage", {})
+    FLUSH_INTERVAL = STORAGE_SETTINGS.get("flush_interval", FLUSH_INTERVAL)
+    FLUSH_THRESHOLD = STORAGE_SETTINGS.get("flush_threshold", FLUSH_THRESHOLD)
+    GUILD_CACHE_MB = STORAGE_SETTINGS.get("guild_cache_mb", GUILD_CACHE_MB)
+    storage.fsync_interval = STORAGE_SETTINGS.get("fsync_interval", FSYNC_INTERVAL)
+    storage.generations = STORAGE_SETTINGS.get("generations", SNAPSHOT_GENERATIONS)
+    flush_alliance.change_interval(seconds=FLUSH_INTERVAL)
+
+    write_behind = WriteBehind(storage, FLUSH_THRESHOLD)
+    guild_cache = GuildAccountCache(alliance, storage, int(GUILD_CACHE_MB * 2**20))
+    load_economy_settings()
+    HELP_CATEGORIES = help_categories()
+    atexit.register(flush_pending)
+    return alliance
+
+def load_alliance():
+    """The live alliances.json document; parsed once, by open_storage()."""
+    return alliance
+
+def flush_pending():
+    """Push dirty paths to the writer and block until they are on disk."""
+    counting.checkpoint()
+    write_behind.flush()
+    storage.join()
+
+@tasks.loop(seconds=FLUSH_INTERVAL)
+async def flush_alliance():
+    start = time.perf_counter()
+    write_behind.flush()
+    stats.add_persistence(time.perf_counter() - start)
+
+def save_alliance(data, *paths):
+    """Persist alliances.json.
+
+    With key paths (e.g. `(guild_id, user_id)`) those entries are marked
+    dirty and written by the next flush; without any, pending changes are
+    flushed and the whole file is checkpointed.
+    """
+    start = time.perf_counter()
+    if paths:
+        write_behind.mark_dirty(*paths)
+    else:
+        write_behind.flush()
+        storage.checkpoint(data)
+    stats.add_persistence(time.perf_counter() - start)
+
+# ------------------------------
+# Resident guild partitions
+# ------------------------------
+ACCOUNT_BYTES = 190             # resident bytes per Account (benchmarks/bench_memory.py)
+LEADERBOARD_USER_BYTES = 440    # per user of a built GuildLeaderboard
+
+class GuildAccountCache:
+    """Guild AccountTables kept in `alliance` in LRU order under a memory budget.
+
+    A guild is read from its shard the first time it is touched; handlers
+    `await load()` first so the read happens in a worker thread, and get()
+    only reads synchronously for callers outside the event loop. Once the
+    estimated footprint of resident accounts and leaderboards passes the
+    budget, pending writes are flushed and the least recently used guilds
+    are dropped along with their leaderboard index. Handlers never await
+    between load(), get_user_data() and save_user_data(), so an entry being
+    changed always belongs to a resident guild.
+    """
+
+    def __init__(self, state: dict, storage: AllianceStorage, budget_bytes: int):
+        self.state = state
+        self.storage = storage
+        self.budget = budget_bytes
+        self._lru = collections.OrderedDict()     # guild_id -> None, least recent first
+        self._loading = {}                        # guild_id -> future of a read in progress
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_time = 0.0
+
+    def _resident(self, key: str):
+        table = self.state.get(key)
+        if table is not None:
+            self._lru.move_to_end(key)
+            self.hits += 1
+        return table
+
+    def _read(self, key: str):
+        start = time.perf_counter()
+        table = AccountTable(self.storage.load_guild(key))
+        return table, time.perf_counter() - start
+
+    def _install(self, key: str, table: AccountTable, elapsed: float) -> AccountTable:
+        self.state[key] = table
+        self.load_time += elapsed
+        self._lru[key] = None
+        self.loads += 1
+        self._evict(keep=key)
+        return table
+
+    def get(self, guild_id) -> AccountTable:
+        key = str(guild_id)
+        table = self._resident(key)
+        if table is None:
+            table = self._install(key, *self._read(key))
+        return table
+
+    async def load(self, guild_id) -> AccountTable:
+        """get() for handlers: a missing guild is parsed in a thread, once however many wait for it."""
+        key = str(guild_id)
+        table = self._resident(key)
+        if table is not None:
+            return table
+
+        pending = self._loading.get(key)
+        if pending is None:
+            pending = self._loading[key] = asyncio.ensure_future(asyncio.to_thread(self._read, key))
+            pending.add_done_callback(lambda _: self._loading.pop(key, None))
+        table, elapsed = await asyncio.shield(pending)
+
+        # The first waiter to wake up installs the table; the others find it resident
+        return self._resident(key) or self._install(key, table, elapsed)
+
+    def resident_users(self) -> int:
+        return sum(len(self.state[key]) for key in self._lru)
+
+    def guild_bytes(self, key: str) -> int:
+        board = leaderboards.guilds.get(int(key))
+        return len(self.state[key]) * ACCOUNT_BYTES + (len(board) * LEADERBOARD_USER_BYTES if board else 0)
+
+    def resident_bytes(self) -> int:
+        return sum(self.guild_bytes(key) for key in self._lru)
+
+    def _evict(self, keep: str):
+        resident = self.resident_bytes()
+        if resident <= self.budget:
+            return
+        # Dirty paths are read from `state` at flush time: write them while still resident
+        write_behind.flush()
+        for key in list(self._lru):
+            if resident <= self.budget:
+                break
+            if key == keep:
+                continue
+            resident -= self.guild_bytes(key)
+            table = self.state.pop(key)
+            del self._lru[key]
+            self.storage.unload_guild(key, table)
+            leaderboards.drop(key)
+            self.evictions += 1
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.loads
+        return {
+            "resident_guilds": len(self._lru),
+            "resident_users": self.resident_users(),
+            "estimated_mb": round(self.resident_bytes() / 2**20, 1),
+            "budget_mb": round(self.budget / 2**20, 1),
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 1.0,
+            "avg_load_ms": round(self.load_time / self.loads * 1000, 3) if self.loads else 0.0
+        }
+
+guild_cache = None             # GuildAccountCache, built by open_storage()
+
+def guild_accounts(guild_id) -> AccountTable:
+    return guild_cache.get(guild_id)
+
+async def load_guild_accounts(guild_id) -> AccountTable:
+    """Make a guild resident without blocking the loop; await before get_user_data()."""
+    return await guild_cache.load(guild_id)
+
+def get_user_data(guild_id, user_id) -> Account:
+    """Return or create a user's Account inside alliances.json"""
+    return guild_accounts(guild_id).setdefault(user_id)
+
+def save_user_data(guild_id, *user_ids):
+    """Log the economy entries of the given users and re-rank them."""
+    save_alliance(alliance, *((str(guild_id), str(user_id)) for user_id in user_ids))
+    for user_id in user_ids:
+        leaderboards.update(guild_id, user_id)
+
+# ------------------------------
+# Incremental leaderboard index
+# ------------------------------
+LEADERBOARD_ORDERS = ("wallet", "bank", "net")
+LEADERBOARD_PAGE_SIZE = 10
+
+class GuildLeaderboard:
+    """Sorted (-amount, user_id) indexes of one guild for wallet, bank and net worth."""
+
+    __slots__ = ("orders", "values")
+
+    def __init__(self, guild_data: dict):
+        self.values = {}
+        entries = {order: [] for order in LEADERBOARD_ORDERS}
+        for user_id, data in guild_data.items():
+            values = self._amounts(data)
+            self.values[int(user_id)] = values
+            for order, amount in zip(LEADERBOARD_ORDERS, values):
+                entries[order].append((-amount, int(user_id)))
+        self.orders = {order: SortedList(items) for order, items in entries.items()}
+
+    @staticmethod
+    def _amounts(data: Account):
+        wallet, bank = data.wallet, data.bank
+        return (wallet, bank, wallet + bank)
+
+    def update(self, user_id: int, data):
+        """Re-rank one user in O(log n); `data=None` drops them."""
+        new = self._amounts(data) if data is not None else None
+        old = self.values.get(user_id)
+        if old == new:
+            return
+        if old is not None:
+            for order, amount in zip(LEADERBOARD_ORDERS, old):
+                self.orders[order].remove((-amount, user_id))
+            del self.values[user_id]
+        if new is not None:
+            for order, amount in zip(LEADERBOARD_ORDERS, new):
+                self.orders[order].add((-amount, user_id))
+            self.values[user_id] = new
+
+    def top(self, order: str, offset: int = 0, limit: int = LEADERBOARD_PAGE_SIZE):
+        """[(user_id, amount)] for ranks offset+1 .. offset+limit in O(log n + K)."""
+        return [(user_id, -neg) for neg, user_id in self.orders[order].islice(offset, offset + limit)]
+
+    def rank(self, order: str, user_id: int):
+        """1-based rank of a user, or None if they have no account."""
+        values = self.values.get(user_id)
+        if values is None:
+            return None
+        amount = values[LEADERBOARD_ORDERS.index(order)]
+        return self.orders[order].bisect_left((-amount, user_id)) + 1
+
+    def __len__(self):
+        return len(self.values)
+
+class LeaderboardIndex:
+    """Per-guild GuildLeaderboard, built on first query and then kept up to date."""
+
+    def __init__(self):
+        self.guilds = {}
+
+    def guild(self, guild_id) -> GuildLeaderboard:
+        board = self.guilds.get(int(guild_id))
+        if board is None:
+            board = self.guilds[int(guild_id)] = GuildLeaderboard(guild_accounts(guild_id))
+        return board
+
+    def update(self, guild_id, user_id):
+        board = self.guilds.get(int(guild_id))
+        if board is not None:
+            board.update(int(user_id), guild_accounts(guild_id).get(user_id))
+
+    def drop(self, guild_id):
+        """Forget a guild's index (its accounts were evicted); rebuilt on the next query."""
+        self.guilds.pop(int(guild_id), None)
+
+leaderboards = LeaderboardIndex()
+
+# ------------------------------
+# Keyed economy locks
+# ------------------------------
+class KeyedLockManager:
+    """asyncio locks keyed by (guild_id, user_id).
+
+    Locks are created on first use and dropped as soon as nobody holds or
+    waits on them, so memory tracks the number of in-flight keys. Multi-key
+    holds acquire in sorted order, which makes two-party operations such as
+    /rob deadlock-free.
+    """
+
+    def __init__(self):
+        self._locks = {}          # key -> [asyncio.Lock, holders + waiters]
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.evictions = 0
+
+    @contextlib.asynccontextmanager
+    async def hold(self, *keys):
+        keys = sorted(set(keys))
+        entries, acquired = [], []
+        try:
+            for key in keys:
+                entry = self._locks.get(key)
+                if entry is None:
+                    entry = self._locks[key] = [asyncio.Lock(), 0]
+                entry[1] += 1
+                entries.append((key, entry))
+
+                if entry[0].locked():
+                    self.contended += 1
+                    start = time.perf_counter()
+                    await entry[0].acquire()
+                    waited = time.perf_counter() - start
+                    self.wait_time += waited
+                    self.max_wait = max(self.max_wait, waited)
+                else:
+                    await entry[0].acquire()
+                acquired.append(entry[0])
+                self.acquisitions += 1
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+            for key, entry in entries:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+                    self.evictions += 1
+
+    def metrics(self) -> dict:
+        return {
+            "active": len(self._locks),
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "avg_wait_ms": round(self.wait_time / self.contended * 1000, 3) if self.contended else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "evictions": self.evictions
+        }
+
+economy_locks = KeyedLockManager()
+
+def user_key(guild_id, user_id):
+    return (int(guild_id), int(user_id))
+
+# ------------------------------
+# Cooldowns
+# ------------------------------
+# Expiry timestamps live in one array('d') per action, indexed by a slot
+# assigned to each (guild_id, user_id) while any of its timers is running.
+# A heap of (expires_at, slot, action) lazily zeroes finished timers and
+# recycles slots whose timers have all ended. The expiry is also written into
+# the user's economy entry ("cooldowns": {action: unix time}) in the same save
+# as the reward, and read back the first time a guild is checked.
+
+class CooldownStore:
+    def __init__(self):
+        self.actions: dict[str, int] = {}
+        self.expiry: list[array.array] = []          # per action, per slot
+        self.slots: dict[tuple, int] = {}            # (guild_id, user_id) → slot
+        self.keys: list = []                         # slot → (guild_id, user_id) or None
+        self.free: list[int] = []
+        self.heap: list[tuple] = []
+        self.loaded: set[int] = set()
+
+    def _action(self, action: str) -> int:
+        index = self.actions.get(action)
+        if index is None:
+            index = self.actions[action] = len(self.expiry)
+            self.expiry.append(array.array("d", bytes(8 * len(self.keys))))
+        return index
+
+    def _slot(self, key: tuple) -> int:
+        slot = self.slots.get(key)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+                self.keys[slot] = key
+            else:
+                slot = len(self.keys)
+                self.keys.append(key)
+                for expiry in self.expiry:
+                    expiry.append(0.0)
+            self.slots[key] = slot
+        return slot
+
+    def _load_guild(self, guild_id: int):
+        """Pick up timers persisted in this guild's economy entries (once per guild)."""
+        self.loaded.add(guild_id)
+        now = time.time()
+        for user_id, user_data in guild_accounts(guild_id).items():
+            saved = user_data.get("cooldowns")
+            if not saved:
+                continue
+            for action, expires_at in list(saved.items()):
+                if expires_at > now:
+                    self._set((guild_id, int(user_id)), action, expires_at)
+                else:
+                    del saved[action]
+
+    def _set(self, key: tuple, action: str, expires_at: float):
+        index = self._action(action)
+        slot = self._slot(key)
+        self.expiry[index][slot] = expires_at
+        heapq.heappush(self.heap, (expires_at, slot, index))
+
+    def _sweep(self, now: float):
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            expires_at, slot, index = heapq.heappop(heap)
+            if self.expiry[index][slot] != expires_at:
+                continue  # re-armed since; a newer heap entry covers it
+            self.expiry[index][slot] = 0.0
+            if all(expiry[slot] == 0.0 for expiry in self.expiry):
+                del self.slots[self.keys[slot]]
+                self.keys[slot] = None
+                self.free.append(slot)
+
+    def remaining(self, guild_id: int, user_id: int, action: str) -> float:
+        """Seconds until `action` is available again (0 when ready)."""
+        if guild_id not in self.loaded:
+            self._load_guild(guild_id)
+        slot = self.slots.get((guild_id, user_id))
+        index = self.actions.get(action)
+        if slot is None or index is None:
+            return 0.0
+        return max(0.0, self.expiry[index][slot] - time.time())
+
+    def start(self, guild_id: int, user_id: int, action: str, seconds: float, user_data: dict = None) -> float:
+        """Arm a timer; with `user_data` it is also recorded for the next save of that entry."""
+        now = time.time()
+        self._sweep(now)
+        if not seconds:
+            return 0.0
+        expires_at = now + seconds
+        self._set((guild_id, user_id), action, expires_at)
+        if user_data is not None:
+            user_data.setdefault("cooldowns", {})[action] = round(expires_at)
+        return expires_at
+
+    def pending(self, guild_id: int, user_id: int) -> list[tuple[str, float]]:
+        """(action, expires_at) for every running timer of one user."""
+        if guild_id not in self.loaded:
+            self._load_guild(guild_id)
+        slot = self.slots.get((guild_id, user_id))
+        if slot is None:
+            return []
+        now = time.time()
+        return [
+            (action, self.expiry[index][slot])
+            for action, index in self.actions.items()
+            if self.expiry[index][slot] > now
+        ]
+
+    def metrics(self) -> dict:
+        return {"users": len(self.slots), "slots": len(self.keys), "heap": len(self.heap)}
+
+cooldowns = CooldownStore()
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds + 0.999)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    parts = [f"{hours}h"] if hours else []
+    if minutes:
+        parts.append(f"{minutes}m")
+    if seconds or not parts:
+        parts.append(f"{seconds}s")
+    return " ".join(parts)
+
+async def cooldown_block(interaction: discord.Interaction, action: str) -> bool:
+    """Reply and return True if the invoker's `action` is still cooling down."""
+    await load_guild_accounts(interaction.guild.id)
+    left = cooldowns.remaining(interaction.guild.id, interaction.user.id, action)
+    if left <= 0:
+        return False
+    await interaction.response.send_message(
+        f"⏳ You can use `/{action}` again in **{format_duration(left)}** (<t:{int(time.time() + left)}:R>).",
+        ephemeral=True
+    )
+    return True
 
 # ------------------------------
 # /balance
@@ -1043,6 +4048,7 @@ def get_user_data(guild_id, user_id):
 @app_commands.describe(member="Optional member to check")
 async def balance_cmd(interaction: discord.Interaction, member: discord.Member = None):
     member = member or interaction.user
+    await load_guild_accounts(interaction.guild.id)
     user_data = get_user_data(interaction.guild.id, member.id)
     embed = discord.Embed(
         title=f"💰 {member.display_name}'s Balance",
@@ -1058,10 +4064,16 @@ async def balance_cmd(interaction: discord.Interaction, member: discord.Member =
 # ------------------------------
 @tree.command(name="work", description="Work and earn money.")
 async def work_cmd(interaction: discord.Interaction):
-    user_data = get_user_data(interaction.guild.id, interaction.user.id)
-    earnings = random.randint(50, 300)
-    user_data['wallet'] += earnings
-    save_alliance(alliance)
+    if await cooldown_block(interaction, "work"):
+        return
+    async with economy_locks.hold(user_key(interaction.guild.id, interaction.user.id)):
+        if await cooldown_block(interaction, "work"):
+            return
+        user_data = get_user_data(interaction.guild.id, interaction.user.id)
+        earnings = random.randint(50, 300)
+        user_data['wallet'] += earnings
+        cooldowns.start(interaction.guild.id, interaction.user.id, "work", COOLDOWNS.get("work"), user_data)
+        save_user_data(interaction.guild.id, interaction.user.id)
     embed = discord.Embed(
         title="💼 Work Completed",
         description=f"You worked hard and earned **${earnings}**!",
@@ -1078,33 +4090,41 @@ async def rob_cmd(interaction: discord.Interaction, target: discord.Member):
     if target.id == interaction.user.id:
         return await interaction.response.send_message("❌ You cannot rob yourself.", ephemeral=True)
 
-    user_data = get_user_data(interaction.guild.id, interaction.user.id)
-    target_data = get_user_data(interaction.guild.id, target.id)
-
-    if target_data['wallet'] < 100:
-        return await interaction.response.send_message("❌ Target does not have enough money to rob.", ephemeral=True)
+    if await cooldown_block(interaction, "rob"):
+        return
 
-    success = random.choice([True, False])
-    if success:
-        stolen = random.randint(50, min(200, target_data['wallet']))
-        user_data['wallet'] += stolen
-        target_data['wallet'] -= stolen
-        save_alliance(alliance)
-        embed = discord.Embed(
-            title="💰 Robbery Successful",
-            description=f"You successfully robbed **{target.display_name}** for **${stolen}**!",
-            color=discord.Color.green()
-        )
-    else:
-        penalty = random.randint(20, min(100, user_data['wallet']))
-        user_data['wallet'] -= penalty
-        target_data['wallet'] += penalty
-        save_alliance(alliance)
-        embed = discord.Embed(
-            title="❌ Robbery Failed",
-            description=f"You got caught! Paid **${penalty}** as penalty.",
-            color=discord.Color.red()
-        )
+    guild_id = interaction.guild.id
+    async with economy_locks.hold(user_key(guild_id, interaction.user.id), user_key(guild_id, target.id)):
+        if await cooldown_block(interaction, "rob"):
+            return
+        user_data = get_user_data(interaction.guild.id, interaction.user.id)
+        target_data = get_user_data(interaction.guild.id, target.id)
+
+        if target_data['wallet'] < 100:
+            return await interaction.response.send_message("❌ Target does not have enough money to rob.", ephemeral=True)
+
+        cooldowns.start(guild_id, interaction.user.id, "rob", COOLDOWNS.get("rob"), user_data)
+        success = random.choice([True, False])
+        if success:
+            stolen = random.randint(50, min(200, target_data['wallet']))
+            user_data['wallet'] += stolen
+            target_data['wallet'] -= stolen
+            save_user_data(interaction.guild.id, interaction.user.id, target.id)
+            embed = discord.Embed(
+                title="💰 Robbery Successful",
+                description=f"You successfully robbed **{target.display_name}** for **${stolen}**!",
+                color=discord.Color.green()
+            )
+        else:
+            penalty = random.randint(min(20, user_data['wallet']), min(100, user_data['wallet']))
+            user_data['wallet'] -= penalty
+            target_data['wallet'] += penalty
+            save_user_data(interaction.guild.id, interaction.user.id, target.id)
+            embed = discord.Embed(
+                title="❌ Robbery Failed",
+                description=f"You got caught! Paid **${penalty}** as penalty.",
+                color=discord.Color.red()
+            )
     await interaction.response.send_message(embed=embed)
 
 # ------------------------------
@@ -1113,22 +4133,24 @@ async def rob_cmd(interaction: discord.Interaction, target: discord.Member):
 @tree.command(name="deposit", description="Deposit money into your bank.")
 @app_commands.describe(amount="Amount to deposit, or 'all'")
 async def deposit_cmd(interaction: discord.Interaction, amount: str):
-    user_data = get_user_data(interaction.guild.id, interaction.user.id)
-    wallet = user_data['wallet']
+    async with economy_locks.hold(user_key(interaction.guild.id, interaction.user.id)):
+        await load_guild_accounts(interaction.guild.id)
+        user_data = get_user_data(interaction.guild.id, interaction.user.id)
+        wallet = user_data['wallet']
 
-    if amount.lower() == "all":
-        deposit_amount = wallet
-    else:
-        try:
-            deposit_amount = int(amount)
-        except:
-            return await interaction.response.send_message("❌ Invalid amount.", ephemeral=True)
-        if deposit_amount > wallet:
-            return await interaction.response.send_message("❌ You don't have that much in wallet.", ephemeral=True)
+        if amount.lower() == "all":
+            deposit_amount = wallet
+        else:
+            try:
+                deposit_amount = int(amount)
+            except:
+                return await interaction.response.send_message("❌ Invalid amount.", ephemeral=True)
+            if deposit_amount > wallet:
+                return await interaction.response.send_message("❌ You don't have that much in wallet.", ephemeral=True)
 
-    user_data['wallet'] -= deposit_amount
-    user_data['bank'] += deposit_amount
-    save_alliance(alliance)
+        user_data['wallet'] -= deposit_amount
+        user_data['bank'] += deposit_amount
+        save_user_data(interaction.guild.id, interaction.user.id)
 
     embed = discord.Embed(
         title="🏦 Deposit Successful",
@@ -1143,22 +4165,24 @@ async def deposit_cmd(interaction: discord.Interaction, amount: str):
 @tree.command(name="withdraw", description="Withdraw money from your bank.")
 @app_commands.describe(amount="Amount to withdraw, or 'all'")
 async def withdraw_cmd(interaction: discord.Interaction, amount: str):
-    user_data = get_user_data(interaction.guild.id, interaction.user.id)
-    bank = user_data['bank']
+    async with economy_locks.hold(user_key(interaction.guild.id, interaction.user.id)):
+        await load_guild_accounts(interaction.guild.id)
+        user_data = get_user_data(interaction.guild.id, interaction.user.id)
+        bank = user_data['bank']
 
-    if amount.lower() == "all":
-        withdraw_amount = bank
-    else:
-        try:
-            withdraw_amount = int(amount)
-        except:
-            return await interaction.response.send_message("❌ Invalid amount.", ephemeral=True)
-        if withdraw_amount > bank:
-            return await interaction.response.send_message("❌ You don't have that much in bank.", ephemeral=True)
+        if amount.lower() == "all":
+            withdraw_amount = bank
+        else:
+            try:
+                withdraw_amount = int(amount)
+            except:
+                return await interaction.response.send_message("❌ Invalid amount.", ephemeral=True)
+            if withdraw_amount > bank:
+                return await interaction.response.send_message("❌ You don't have that much in bank.", ephemeral=True)
 
-    user_data['wallet'] += withdraw_amount
-    user_data['bank'] -= withdraw_amount
-    save_alliance(alliance)
+        user_data['wallet'] += withdraw_amount
+        user_data['bank'] -= withdraw_amount
+        save_user_data(interaction.guild.id, interaction.user.id)
 
     embed = discord.Embed(
         title="🏦 Withdraw Successful",
@@ -1173,39 +4197,73 @@ async def withdraw_cmd(interaction: discord.Interaction, amount: str):
 @tree.command(name="gamble", description="Gamble money from your wallet.")
 @app_commands.describe(amount="Amount to gamble")
 async def gamble_cmd(interaction: discord.Interaction, amount: int):
-    user_data = get_user_data(interaction.guild.id, interaction.user.id)
-    wallet = user_data['wallet']
-
-    if amount > wallet:
-        return await interaction.response.send_message("❌ You don't have that much in wallet.", ephemeral=True)
-
-    win = random.choice([True, False])
-    if win:
-        winnings = int(amount * random.uniform(1.2, 2.0))
-        user_data['wallet'] += winnings
-        result_text = f"You won **${winnings}**!"
-        color = discord.Color.green()
-    else:
-        user_data['wallet'] -= amount
-        result_text = f"You lost **${amount}**."
-        color = discord.Color.red()
+    async with economy_locks.hold(user_key(interaction.guild.id, interaction.user.id)):
+        await load_guild_accounts(interaction.guild.id)
+        user_data = get_user_data(interaction.guild.id, interaction.user.id)
+        wallet = user_data['wallet']
+
+        if amount > wallet:
+            return await interaction.response.send_message("❌ You don't have that much in wallet.", ephemeral=True)
+
+        win = random.choice([True, False])
+        if win:
+            winnings = int(amount * random.uniform(1.2, 2.0))
+            user_data['wallet'] += winnings
+            result_text = f"You won **${winnings}**!"
+            color = discord.Color.green()
+        else:
+            user_data['wallet'] -= amount
+            result_text = f"You lost **${amount}**."
+            color = discord.Color.red()
 
-    save_alliance(alliance)
+        save_user_data(interaction.guild.id, interaction.user.id)
     embed = discord.Embed(title="🎰 Gamble Result", description=result_text, color=color)
     await interaction.response.send_message(embed=embed)
 
+# ------------------------------
+# /cooldowns
+# ------------------------------
+@tree.command(name="cooldowns", description="Show pending economy cooldowns.")
+@app_commands.describe(member="Optional member to check")
+async def cooldowns_cmd(interaction: discord.Interaction, member: discord.Member = None):
+    member = member or interaction.user
+    await load_guild_accounts(interaction.guild.id)
+    timers = sorted(cooldowns.pending(interaction.guild.id, member.id), key=lambda timer: timer[1])
+    embed = discord.Embed(title=f"⏳ {member.display_name}'s Cooldowns", color=discord.Color.blurple())
+    if not timers:
+        embed.description = "No active cooldowns. Everything is ready!"
+    now = time.time()
+    for action, expires_at in timers:
+        embed.add_field(name=f"/{action}", value=f"{format_duration(expires_at - now)} • <t:{int(expires_at)}:R>", inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 # ------------------------------
 # /leaderboard
 # ------------------------------
-@tree.command(name="leaderboard", description="Show wallet leaderboard for this guild.")
-async def leaderboard_cmd(interaction: discord.Interaction):
-    guild_data = alliance.get(str(interaction.guild.id), {})
-    leaderboard = sorted(guild_data.items(), key=lambda x: x[1].get("wallet", 0), reverse=True)
-    embed = discord.Embed(title="🏆 Wallet Leaderboard", color=discord.Color.gold())
-    for i, (user_id, data) in enumerate(leaderboard[:10], start=1):
-        member = interaction.guild.get_member(int(user_id))
+@tree.command(name="leaderboard", description="Show the economy leaderboard for this guild.")
+@app_commands.describe(order="Rank by wallet, bank or net worth", page="Page number")
+@app_commands.choices(order=[
+    app_commands.Choice(name="Wallet", value="wallet"),
+    app_commands.Choice(name="Bank", value="bank"),
+    app_commands.Choice(name="Net Worth", value="net")
+])
+async def leaderboard_cmd(interaction: discord.Interaction, order: str = "wallet", page: int = 1):
+    await load_guild_accounts(interaction.guild.id)
+    board = leaderboards.guild(interaction.guild.id)
+    pages = max(1, -(-len(board) // LEADERBOARD_PAGE_SIZE))
+    page = min(max(page, 1), pages)
+    offset = (page - 1) * LEADERBOARD_PAGE_SIZE
+
+    titles = {"wallet": "🏆 Wallet Leaderboard", "bank": "🏦 Bank Leaderboard", "net": "💎 Net Worth Leaderboard"}
+    embed = discord.Embed(title=titles[order], color=discord.Color.gold())
+    for i, (user_id, amount) in enumerate(board.top(order, offset), start=offset + 1):
+        member = interaction.guild.get_member(user_id)
         name = member.display_name if member else f"User ID {user_id}"
-        embed.add_field(name=f"{i}. {name}", value=f"${data.get('wallet', 0)}", inline=False)
+        embed.add_field(name=f"{i}. {name}", value=f"${amount}", inline=False)
+
+    rank = board.rank(order, interaction.user.id)
+    rank_text = f"Your rank: #{rank}" if rank else "You are not ranked yet"
+    embed.set_footer(text=f"Page {page}/{pages} • {rank_text}")
     await interaction.response.send_message(embed=embed)
 
 # ------------------------------
@@ -1220,7 +4278,6 @@ shop_items = {
 @tree.command(name="shop", description="View or buy items from the shop.")
 @app_commands.describe(item="Item to buy (optional)")
 async def shop_cmd(interaction: discord.Interaction, item: str = None):
-    user_data = get_user_data(interaction.guild.id, interaction.user.id)
     if not item:
         embed = discord.Embed(title="🛒 Shop", color=discord.Color.blue())
         for name, price in shop_items.items():
@@ -1230,20 +4287,163 @@ async def shop_cmd(interaction: discord.Interaction, item: str = None):
         item_price = shop_items.get(item)
         if not item_price:
             return await interaction.response.send_message("❌ Item not found.", ephemeral=True)
-        if user_data['wallet'] < item_price:
-            return await interaction.response.send_message("❌ You don't have enough money.", ephemeral=True)
-        user_data['wallet'] -= item_price
-        save_alliance(alliance)
+        async with economy_locks.hold(user_key(interaction.guild.id, interaction.user.id)):
+            await load_guild_accounts(interaction.guild.id)
+            user_data = get_user_data(interaction.guild.id, interaction.user.id)
+            if user_data['wallet'] < item_price:
+                return await interaction.response.send_message("❌ You don't have enough money.", ephemeral=True)
+            user_data['wallet'] -= item_price
+            save_user_data(interaction.guild.id, interaction.user.id)
         await interaction.response.send_message(f"✅ You bought **{item}** for **${item_price}**!")
 
 # ------------------------------
 # Notes
 # ------------------------------
-# 1. All economy data stored inside `alliances.json`.
+# 1. Economy data is stored per guild in `data/guilds/<guild_id>.json` (loaded on demand).
 # 2. Supports slash commands only.
 # 3. Combines /balance, /work, /rob, /deposit, /withdraw, /gamble, /leaderboard, /shop.
 # 4. All embeds professional and consistent with branding.
 
+# ===========================================
+# SECTION 7B — TRANSLATION SERVICE (/tr)
+# ===========================================
+# deep-translator is blocking, so provider calls run in a small thread pool.
+# Results are cached (LRU + TTL) by (sha1 of text, target language), and
+# identical requests that arrive while a call is in flight share its result.
+# ELURA_TRANSLATOR=stub swaps in an offline provider for tests/benchmarks.
+
+TRANSLATE_WORKERS = 4
+TRANSLATE_CACHE_SIZE = 2048
+TRANSLATE_CACHE_TTL = 6 * 3600      # seconds
+TRANSLATE_MAX_CHARS = 2000          # one Discord message
+
+class TranslationProvider(abc.ABC):
+    """Blocking `translate(text, target) -> str`; always called from the pool."""
+    name = "base"
+
+    @abc.abstractmethod
+    def translate(self, text: str, target: str) -> str:
+        ...
+
+class GoogleProvider(TranslationProvider):
+    name = "google"
+
+    def translate(self, text: str, target: str) -> str:
+        # Imported on first use: deep-translator pulls in requests, which startup never needs
+        from deep_translator import GoogleTranslator
+        return GoogleTranslator(source="auto", target=target).translate(text)
+
+class StubProvider(TranslationProvider):
+    """No network: returns the text tagged with the target language."""
+    name = "stub"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def translate(self, text: str, target: str) -> str:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return f"[{target}] {text}"
+
+TRANSLATION_PROVIDERS = {"google": GoogleProvider, "stub": StubProvider}
+
+class TranslationService:
+    def __init__(self, provider: TranslationProvider, workers: int = TRANSLATE_WORKERS,
+                 cache_size: int = TRANSLATE_CACHE_SIZE, ttl: float = TRANSLATE_CACHE_TTL):
+        self.provider = provider
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+        self._cache = collections.OrderedDict()   # key → (expires_at, translated)
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    @staticmethod
+    def cache_key(text: str, target: str) -> tuple:
+        return (hashlib.sha1(text.encode("utf-8")).digest(), target)
+
+    async def translate(self, text: str, target: str = "en") -> str:
+        key = self.cache_key(text, target)
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._cache[key]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            future = asyncio.get_running_loop().run_in_executor(self._pool, self.provider.translate, text, target)
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finished(key, f))
+        # Shielded so one cancelled caller does not cancel the call for the others
+        return await asyncio.shield(future)
+
+    def _finished(self, key: tuple, future: asyncio.Future):
+        self._inflight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            self.errors += 1
+            return
+        self._cache[key] = (time.monotonic() + self.ttl, future.result())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> dict:
+        return {
+            "provider": self.provider.name,
+            "cached": len(self._cache),
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors
+        }
+
+translator = TranslationService(TRANSLATION_PROVIDERS.get(os.getenv("ELURA_TRANSLATOR", "google"), GoogleProvider)())
+
+def translation_embed(original: str, translated: str, target: str) -> discord.Embed:
+    embed = clean_embed(title=f"🌐 Translation • {target}", description=translated[:4000])
+    embed.add_field(name="Original", value=original[:1024], inline=False)
+    return embed
+
+async def send_translation(interaction: discord.Interaction, text: str, target: str, ephemeral: bool = False):
+    if not text.strip():
+        return await interaction.response.send_message(embed=error_embed("There is no text to translate."), ephemeral=True)
+    if len(text) > TRANSLATE_MAX_CHARS:
+        return await interaction.response.send_message(
+            embed=error_embed(f"Text is too long (max {TRANSLATE_MAX_CHARS} characters)."), ephemeral=True
+        )
+
+    await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+    try:
+        translated = await translator.translate(text, target.lower())
+    except Exception:
+        log.exception("Translation to %s failed", target)
+        return await interaction.followup.send(embed=error_embed("Translation failed. Please try again later."), ephemeral=True)
+    await interaction.followup.send(embed=translation_embed(text, translated, target.lower()), ephemeral=ephemeral)
+
+@tree.command(name="tr", description="Translate text (English by default).")
+@app_commands.describe(text="Text to translate", target="Target language code, e.g. en, es, de")
+async def tr_cmd(interaction: discord.Interaction, text: str, target: str = "en"):
+    await send_translation(interaction, text, target)
+
+@tree.context_menu(name="Translate to English")
+async def translate_message(interaction: discord.Interaction, message: discord.Message):
+    await send_translation(interaction, message.content, "en", ephemeral=True)
+
 # ===========================================
 # SECTION 8 — HELP SYSTEM (DYNAMIC & PROFESSIONAL)
 # ===========================================
@@ -1253,62 +4453,60 @@ from discord.ui import Select, View
 import json
 import os
 
-# ------------------------------
-# Load alliances.json
-# ------------------------------
-ALLIANCE_FILE = "data/alliances.json"
-
-def load_alliance():
-    if os.path.exists(ALLIANCE_FILE):
-        with open(ALLIANCE_FILE, "r") as f:
-            return json.load(f)
-    return {}
-
-alliance = load_alliance()
-
 # ------------------------------
 # Dynamic economy settings
 # ------------------------------
-ECONOMY_SETTINGS = alliance.get("economy", {})
-STARTING_BALANCE = ECONOMY_SETTINGS.get("starting_balance", 0)
-WORK_MIN = ECONOMY_SETTINGS.get("work_min", 50)
-WORK_MAX = ECONOMY_SETTINGS.get("work_max", 150)
-ROB_MIN = ECONOMY_SETTINGS.get("rob_min", 20)
-ROB_MAX = ECONOMY_SETTINGS.get("rob_max", 200)
-SHOP_ITEMS = ECONOMY_SETTINGS.get("shop", [])
-COOLDOWNS = ECONOMY_SETTINGS.get("cooldowns", {"work": 3600, "rob": 7200})
+def load_economy_settings():
+    """Read the "economy" block; called again by open_storage() for the live document."""
+    global ECONOMY_SETTINGS, STARTING_BALANCE, WORK_MIN, WORK_MAX, ROB_MIN, ROB_MAX, SHOP_ITEMS, COOLDOWNS
+    ECONOMY_SETTINGS = alliance.get("economy", {})
+    STARTING_BALANCE = ECONOMY_SETTINGS.get("starting_balance", 0)
+    WORK_MIN = ECONOMY_SETTINGS.get("work_min", 50)
+    WORK_MAX = ECONOMY_SETTINGS.get("work_max", 150)
+    ROB_MIN = ECONOMY_SETTINGS.get("rob_min", 20)
+    ROB_MAX = ECONOMY_SETTINGS.get("rob_max", 200)
+    SHOP_ITEMS = ECONOMY_SETTINGS.get("shop", [])
+    COOLDOWNS = ECONOMY_SETTINGS.get("cooldowns", {"work": 3600, "rob": 7200})
+
+load_economy_settings()
 
 # ------------------------------
 # Command categories
 # ------------------------------
-HELP_CATEGORIES = {
-    "General": [
-        {"name": "/setup", "description": "Configure server channels and settings."},
-        {"name": "/balance", "description": f"Check your wallet and bank balance. Starting balance: ${STARTING_BALANCE}."},
-        {"name": "/work", "description": f"Work to earn coins ({WORK_MIN}-{WORK_MAX})."},
-        {"name": "/rob", "description": f"Attempt to rob another member ({ROB_MIN}-{ROB_MAX})."},
-        {"name": "/gamble", "description": "Gamble your coins for a chance to win big."},
-        {"name": "/bet", "description": "Place a bet on a game or outcome."},
-        {"name": "/bj", "description": "Play blackjack against the bot."},
-        {"name": "/shop", "description": f"View items available in the shop ({len(SHOP_ITEMS)} items)."},
-    ],
-    "Moderation": [
-        {"name": "/warn", "description": "Issue a warning to a member.", "restricted": True},
-        {"name": "/warnings", "description": "View a member's warnings.", "restricted": True},
-        {"name": "/unwarn", "description": "Remove a warning from a member.", "restricted": True},
-        {"name": "/mute", "description": "Mute a member temporarily.", "restricted": True},
-        {"name": "/kick", "description": "Kick a member from the server.", "restricted": True},
-        {"name": "/ban", "description": "Ban a member from the server.", "restricted": True},
-        {"name": "/unban", "description": "Unban a member.", "restricted": True},
-    ],
-    "Utilities": [
-        {"name": "/tr", "description": "Translate a message to English."},
-        {"name": "/count", "description": "Check counting channel stats."},
-    ],
-    "Counting": [
-        {"name": "Counting Channel", "description": "Send numbers in sequence. Bot reacts ✅/❌ and tracks progress."},
-    ]
-}
+def help_categories() -> dict:
+    """Help pages; the economy lines quote the current settings."""
+    return {
+        "General": [
+            {"name": "/setup", "description": "Configure server channels and settings."},
+            {"name": "/balance", "description": f"Check your wallet and bank balance. Starting balance: ${STARTING_BALANCE}."},
+            {"name": "/work", "description": f"Work to earn coins ({WORK_MIN}-{WORK_MAX})."},
+            {"name": "/rob", "description": f"Attempt to rob another member ({ROB_MIN}-{ROB_MAX})."},
+            {"name": "/gamble", "description": "Gamble your coins for a chance to win big."},
+            {"name": "/cooldowns", "description": "See when /work and /rob are ready again."},
+            {"name": "/bet", "description": "Place a bet on a game or outcome."},
+            {"name": "/bj", "description": "Play blackjack against the bot."},
+            {"name": "/shop", "description": f"View items available in the shop ({len(SHOP_ITEMS)} items)."},
+        ],
+        "Moderation": [
+            {"name": "/warn", "description": "Issue a warning to a member.", "restricted": True},
+            {"name": "/warnings", "description": "View a member's warnings.", "restricted": True},
+            {"name": "/unwarn", "description": "Remove a warning from a member.", "restricted": True},
+            {"name": "/mute", "description": "Mute a member temporarily.", "restricted": True},
+            {"name": "/kick", "description": "Kick a member from the server.", "restricted": True},
+            {"name": "/ban", "description": "Ban a member from the server.", "restricted": True},
+            {"name": "/unban", "description": "Unban a member.", "restricted": True},
+            {"name": "/bulk ban|kick|mute", "description": "Mass moderation by ID list, join window or name regex.", "restricted": True},
+        ],
+        "Utilities": [
+            {"name": "/tr", "description": "Translate text (English by default), or right-click a message → Apps → Translate to English."},
+            {"name": "/count", "description": "Check counting channel stats."},
+        ],
+        "Counting": [
+            {"name": "Counting Channel", "description": "Send numbers in sequence. Bot reacts ✅/❌ and tracks progress."},
+        ]
+    }
+
+HELP_CATEGORIES = help_categories()
 
 # ------------------------------
 # Help dropdown & view
@@ -1368,32 +4566,160 @@ async def on_ready():
     print(f"\n✅ Logged in as {bot.user} ({bot.user.id})")
     print(f"🌐 Connected to {len(bot.guilds)} guild(s)")
     print(f"⌚ Startup time: {now_utc()}\n")
+    log.info(f"Ready as {bot.user} ({bot.user.id}) in {len(bot.guilds)} guild(s)")
+
+    # on_ready fires again after reconnects; the cold start is reported once
+    if not startup.reported:
+        startup.reported = True
+        startup.mark("gateway connect")
+        print(f"🚀 Cold start in {startup.total:.2f}s\n{startup.report()}\n")
+        log.info("Cold start %.2fs: %s", startup.total, startup.metrics()["phases"])
 
     # Send a professional ready embed to the log channel if set
+    guild_id = alliance.get("guild_settings", {}).get("guild_id")
+    guild = bot.get_guild(int(guild_id)) if guild_id else None
+    log_channel_id = guild_configs.get(guild.id).logs_channel if guild else None
     if log_channel_id:
         try:
-            guild = bot.get_guild(int(guild_id)) if guild_id else None
-            log_channel = guild.get_channel(int(log_channel_id)) if guild else None
+            log_channel = guild.get_channel(log_channel_id)
             if log_channel:
                 embed = discord.Embed(
                     title="🤖 Elura Utility • Bot Online",
                     description=f"Bot **{bot.user.name}** is now online and ready!",
                     color=discord.Color.green(),
-                    timestamp=datetime.now(timezone.utc)
+                    timestamp=datetime.datetime.now(datetime.timezone.utc)
                 )
                 embed.add_field(name="Servers Connected", value=str(len(bot.guilds)), inline=True)
                 embed.add_field(name="Startup Time", value=now_utc(), inline=True)
                 embed.set_footer(text="Elura Utility • Professional Bot Startup")
                 await log_channel.send(embed=embed)
-        except Exception as e:
-            print(f"⚠️ Failed to send ready embed: {e}")
+        except Exception:
+            log.exception("Failed to send ready embed")
 
 # ------------------------------
-# Run Bot
+# Shard launcher
 # ------------------------------
-token = alliance.get("bot", {}).get("token")
+# `python main.py launch <processes> [shards]` splits the shard IDs into
+# contiguous blocks, runs one worker process per block against the shared
+# SQLite database (imported from alliances.json on first launch) and
+# restarts workers that exit, with exponential backoff.
+
+LAUNCH_RESTART_DELAY = 5.0      # first restart delay; doubled after each quick crash
+LAUNCH_RESTART_MAX = 300.0
+LAUNCH_STABLE_AFTER = 60.0      # a worker up this long starts again from the first delay
+IDENTIFY_INTERVAL = 5.0         # Discord allows max_concurrency identifies per 5 seconds
+
+async def fetch_gateway_info(bot_token: str):
+    """(recommended shard count, max_concurrency) from GET /gateway/bot."""
+    client = discord.Client(intents=discord.Intents.none())
+    try:
+        await client.login(bot_token)
+        shards, _, limits = await client.http.get_bot_gateway()
+        return shards, limits.get("max_concurrency", 1)
+    finally:
+        await client.close()
+
+def shard_blocks(shard_count: int, processes: int) -> list[list[int]]:
+    return [list(range(k * shard_count // processes, (k + 1) * shard_count // processes)) for k in range(processes)]
+
+def stored_token(db_path: str):
+    """The bot token from the workers' database, read without opening it as live storage."""
+    with contextlib.closing(sqlite3.connect(db_path)) as conn:
+        row = conn.execute("SELECT value FROM documents WHERE key = 'bot'").fetchone()
+    return json.loads(row[0]).get("token") if row else None
+
+def launch(processes: int, shard_count: int = None):
+    import signal
+    import subprocess
+
+    if not os.path.exists(SQLITE_FILE):
+        try:
+            migrate_to_sqlite(alliance_file, SQLITE_FILE)
+        except Exception:
+            # Leave no half-imported database behind for the next launch to trust
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(SQLITE_FILE + suffix):
+                    os.remove(SQLITE_FILE + suffix)
+            raise
+        print(f"✅ Imported {alliance_file} into {SQLITE_FILE} for the shard workers.")
+    token = stored_token(SQLITE_FILE)
+    if not token:
+        print(f"❌ No token found in {SQLITE_FILE}! Please add your bot token under alliance['bot']['token'].")
+        return
 
-if token:
-    bot.run(token)
-else:
-    print("❌ No token found in data/alliances.json! Please add your bot token under alliance['bot']['token'].")
+    recommended, concurrency = asyncio.run(fetch_gateway_info(token))
+    shard_count = max(shard_count or SHARD_COUNT or recommended, processes)
+    if os.path.isdir(SHARD_STATUS_DIR):
+        for name in os.listdir(SHARD_STATUS_DIR):
+            os.remove(os.path.join(SHARD_STATUS_DIR, name))
+
+    blocks = shard_blocks(shard_count, processes)
+    print(f"🚀 Launching {shard_count} shard(s) over {processes} worker(s) (Discord recommends {recommended}).")
+
+    def spawn(k: int):
+        env = dict(os.environ, ELURA_STORAGE="sqlite", ELURA_SQLITE_FILE=SQLITE_FILE, ELURA_WORKER=str(k),
+                   ELURA_SHARD_COUNT=str(shard_count), ELURA_SHARD_IDS=f"{blocks[k][0]}-{blocks[k][-1]}")
+        if FORCE_COMMAND_SYNC:
+            env["ELURA_FORCE_SYNC"] = "1"
+        # Own session: a terminal Ctrl+C reaches only the launcher, which stops workers one signal each
+        proc = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env, start_new_session=os.name != "nt")
+        print(f"   worker {k}: shards {blocks[k][0]}-{blocks[k][-1]} (pid {proc.pid})")
+        return proc
+
+    def stop(*_):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    workers = {}    # k -> [process, started_at, restart delay, restart at (or None while running)]
+    try:
+        for k in range(processes):
+            workers[k] = [spawn(k), time.monotonic(), LAUNCH_RESTART_DELAY, None]
+            # Stagger identifies: each worker's shards get through the gateway queue before the next starts
+            time.sleep(math.ceil(len(blocks[k]) / concurrency) * IDENTIFY_INTERVAL)
+
+        while True:
+            time.sleep(1)
+            now = time.monotonic()
+            for k, worker in workers.items():
+                proc, started_at, delay, restart_at = worker
+                if restart_at is None and proc.poll() is not None:
+                    if now - started_at >= LAUNCH_STABLE_AFTER:
+                        delay = worker[2] = LAUNCH_RESTART_DELAY
+                    worker[3] = now + delay
+                    print(f"⚠️ Worker {k} exited with code {proc.returncode}; restarting in {delay:.0f}s")
+                elif restart_at is not None and now >= restart_at:
+                    worker[:] = [spawn(k), now, min(delay * 2, LAUNCH_RESTART_MAX), None]
+    except KeyboardInterrupt:
+        print("🛑 Stopping workers...")
+        for proc, *_ in workers.values():
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGINT if os.name != "nt" else signal.SIGTERM)
+        for proc, *_ in workers.values():
+            try:
+                proc.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+# ------------------------------
+# Run Bot
+# ------------------------------
+startup.mark("commands & handlers")
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv if arg != "--force-sync"]
+    if args[1:2] == ["migrate-sqlite"]:
+        # python main.py migrate-sqlite [alliances.json] [alliances.db]
+        source = args[2] if len(args) > 2 else alliance_file
+        target = args[3] if len(args) > 3 else SQLITE_FILE
+        migrated = migrate_to_sqlite(source, target)
+        print(f"✅ Imported {source} into {target} ({len(migrated)} top-level entries).")
+    elif args[1:2] == ["launch"]:
+        # python main.py launch <processes> [shards] [--force-sync]
+        launch(int(args[2]) if len(args) > 2 else os.cpu_count() or 1,
+               int(args[3]) if len(args) > 3 else None)
+    else:
+        token = open_storage().get("bot", {}).get("token")
+        if token:
+            bot.run(token)
+        else:
+            print("❌ No token found in data/alliances.json! Please add your bot token under alliance['bot']['token'].")
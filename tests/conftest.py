@@ -0,0 +1,16 @@
+# ============================================================
+#                 ELURA UTILITY • TEST SETUP
+# ============================================================
+# main.py reads data/ from the working directory, so every test module
+# imports it from a scratch directory with the live storage already open.
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp(prefix="elura-test-"))
+
+import main
+
+main.open_storage()
@@ -0,0 +1,43 @@
+# ============================================================
+#                 ELURA UTILITY • CASE STORE TESTS
+# ============================================================
+#   python -m pytest -q tests
+
+import copy
+
+import main
+
+
+def case(case_id, guild_id, user, case_type="warn"):
+    return {"case": case_id, "guild_id": guild_id, "user": user, "type": case_type}
+
+
+def test_indexes_and_counts_follow_add_and_remove():
+    store = main.CaseStore([case("A", "1", 7), case("B", "1", 7, "mute"), case("C", "2", 7), case("L", None, 7)])
+    assert [c["case"] for c in store.for_member("1", 7)] == ["L", "A", "B"]
+    assert store.counts("1", 7) == {"warn": 2, "mute": 1}
+    assert [c["case"] for c in store.for_guild(2)] == ["C"]
+
+    assert store.pop("A")["case"] == "A"
+    assert store.pop("A") is None
+    assert store.counts("1", 7) == {"warn": 1, "mute": 1}
+    store.pop("B")
+    store.pop("L")
+    assert store.counts("1", 7) == {}
+    assert store._by_member.keys() == {("2", 7)} and store._counts.keys() == {("2", 7)}
+    assert [c["case"] for c in store.of_type("warn")] == ["C"] and store.of_type("mute") == []
+
+
+def test_re_adding_a_case_id_replaces_it():
+    store = main.CaseStore([case("A", "1", 7)])
+    store.append(case("A", "1", 7, "ban"))
+    assert len(store) == 1
+    assert store.counts("1", 7) == {"ban": 1}
+    assert store.of_type("warn") == []
+
+
+def test_guild_scoped_get_and_plain_list_copy():
+    store = main.CaseStore([case("A", "1", 7), case("L", None, 8)])
+    assert store.get("A", 1) is not None and store.get("A", 2) is None
+    assert store.get("L", 2)["case"] == "L"   # legacy cases match every guild
+    assert copy.deepcopy(store) == [case("A", "1", 7), case("L", None, 8)]
@@ -0,0 +1,67 @@
+# ============================================================
+#                ELURA UTILITY • COOLDOWN TESTS
+# ============================================================
+#   python -m pytest -q tests
+
+import pytest
+
+import main
+
+GUILD_ID = 9001
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(main.time, "time", lambda: now[0])
+    return now
+
+
+def test_timers_expire(clock):
+    store = main.CooldownStore()
+    store.start(GUILD_ID, 1, "work", 60)
+    assert store.remaining(GUILD_ID, 1, "work") == 60
+    assert store.remaining(GUILD_ID, 1, "rob") == 0
+    assert store.remaining(GUILD_ID, 2, "work") == 0
+
+    clock[0] += 45
+    assert store.remaining(GUILD_ID, 1, "work") == 15
+    assert store.pending(GUILD_ID, 1) == [("work", 1_000_060.0)]
+    clock[0] += 15
+    assert store.remaining(GUILD_ID, 1, "work") == 0
+    assert store.pending(GUILD_ID, 1) == []
+
+
+def test_slots_are_recycled_once_every_timer_ends(clock):
+    store = main.CooldownStore()
+    store.start(GUILD_ID, 1, "work", 10)
+    store.start(GUILD_ID, 1, "rob", 30)
+    store.start(GUILD_ID, 2, "work", 10)
+
+    clock[0] += 20
+    store.start(GUILD_ID, 3, "work", 10)     # sweeps: user 2 is done, user 1 still has rob
+    assert len(store.keys) == 2
+    assert set(store.slots) == {(GUILD_ID, 1), (GUILD_ID, 3)}
+
+    clock[0] += 20
+    store.start(GUILD_ID, 4, "work", 10)
+    assert len(store.keys) == 2 and set(store.slots) == {(GUILD_ID, 4)}
+    assert store.metrics() == {"users": 1, "slots": 2, "heap": 1}
+
+
+def test_rearming_keeps_only_the_latest_expiry(clock):
+    store = main.CooldownStore()
+    store.start(GUILD_ID, 1, "work", 10)
+    store.start(GUILD_ID, 1, "work", 100)
+    clock[0] += 50
+    store.start(GUILD_ID, 2, "work", 1)      # sweeps the stale first entry
+    assert store.remaining(GUILD_ID, 1, "work") == 50
+
+
+def test_saved_timers_are_loaded_with_the_guild(clock):
+    account = main.get_user_data(GUILD_ID + 1, 7)
+    account["cooldowns"] = {"work": clock[0] + 30, "rob": clock[0] - 5}
+    store = main.CooldownStore()
+    assert store.remaining(GUILD_ID + 1, 7, "work") == 30
+    assert store.remaining(GUILD_ID + 1, 7, "rob") == 0
+    assert account["cooldowns"] == {"work": clock[0] + 30}   # expired entries are pruned
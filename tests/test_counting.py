@@ -0,0 +1,85 @@
+# ============================================================
+#                 ELURA UTILITY • COUNTING TESTS
+# ============================================================
+#   python -m pytest -q tests
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+GUILD_ID = 5
+
+
+class Message:
+    def __init__(self, sent, channel_id, author_id, content):
+        self.sent = sent
+        self.guild = SimpleNamespace(id=GUILD_ID)
+        self.channel = SimpleNamespace(id=channel_id)
+        self.author = SimpleNamespace(id=author_id, mention=f"<@{author_id}>")
+        self.content = content
+
+    async def add_reaction(self, emoji):
+        self.sent.append((self.content, emoji))
+
+    async def reply(self, text):
+        self.sent.append((self.content, "reply"))
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(main, "REACTION_INTERVAL", 0)
+    main.alliance.setdefault("counting", {}).pop(str(GUILD_ID), None)
+    return main.CountingEngine()
+
+
+def count(engine, sent, numbers, channel_id=10):
+    """Dispatch one message per (author, number) in a single tick."""
+    for author_id, number in numbers:
+        engine.handle(Message(sent, channel_id, author_id, str(number)), number)
+
+
+async def drained(engine):
+    while any(state.worker for state in engine.guilds.values()):
+        await asyncio.sleep(0)
+
+
+def test_numbers_are_judged_and_answered_in_dispatch_order(engine):
+    sent = []
+
+    async def run():
+        count(engine, sent, [(1, 1), (2, 2), (2, 3), (1, 1)])
+        await drained(engine)
+
+    asyncio.run(run())
+    assert sent == [("1", "✅"), ("2", "✅"), ("3", "❌"), ("3", "reply"), ("1", "✅")]
+    assert (engine.counted, engine.ruined) == (3, 1)
+
+
+def test_full_outbox_drops_confirmations_but_never_ruins(engine, monkeypatch):
+    monkeypatch.setattr(main, "REACTION_BACKLOG", 3)
+    sent = []
+
+    async def run():
+        count(engine, sent, [(n % 2, n) for n in range(1, 6)] + [(9, 9)])
+        await drained(engine)
+
+    asyncio.run(run())
+    assert engine.dropped == 2
+    assert sent == [("1", "✅"), ("2", "✅"), ("3", "✅"), ("9", "❌"), ("9", "reply")]
+
+
+def test_moving_the_count_channel_keeps_one_state_per_guild(engine):
+    sent = []
+
+    async def run():
+        count(engine, sent, [(1, 1), (2, 2)], channel_id=10)
+        count(engine, sent, [(1, 3)], channel_id=11)
+        await drained(engine)
+
+    asyncio.run(run())
+    assert list(engine.guilds) == [GUILD_ID] and engine.guilds[GUILD_ID].channel_id == 11
+    engine.checkpoint()
+    assert main.alliance["counting"][str(GUILD_ID)] == {"current": 3, "last_user": "1"}
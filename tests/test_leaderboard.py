@@ -0,0 +1,48 @@
+# ============================================================
+#                ELURA UTILITY • LEADERBOARD TESTS
+# ============================================================
+#   python -m pytest -q tests
+
+import random
+
+import main
+
+
+def brute_force(table, order):
+    amounts = {
+        int(user_id): {"wallet": a.wallet, "bank": a.bank, "net": a.wallet + a.bank}[order]
+        for user_id, a in table.items()
+    }
+    return sorted(amounts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_top_and_rank_after_re_ranking():
+    rng = random.Random(0)
+    table = main.AccountTable({str(uid): {"wallet": rng.randint(0, 50), "bank": rng.randint(0, 50)} for uid in range(40)})
+    board = main.GuildLeaderboard(table)
+
+    for _ in range(300):
+        user_id = rng.randrange(45)
+        if rng.random() < 0.1:
+            table.pop(user_id, None)
+        else:
+            account = table.setdefault(user_id)
+            account["wallet"] = rng.randint(0, 50)
+        board.update(user_id, table.get(user_id))
+
+    for order in main.LEADERBOARD_ORDERS:
+        expected = brute_force(table, order)
+        assert board.top(order, 0, len(expected)) == expected
+        assert board.top(order, 10, 5) == expected[10:15]
+        for rank, (user_id, _) in enumerate(expected, start=1):
+            assert board.rank(order, user_id) == rank
+    assert len(board) == len(table)
+
+
+def test_removed_user_is_unranked():
+    table = main.AccountTable({"1": {"wallet": 5, "bank": 0}, "2": {"wallet": 9, "bank": 0}})
+    board = main.GuildLeaderboard(table)
+    assert board.rank("wallet", 1) == 2
+    board.update(2, None)
+    assert board.rank("wallet", 2) is None
+    assert board.top("wallet") == [(1, 5)]
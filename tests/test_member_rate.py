@@ -0,0 +1,24 @@
+# ============================================================
+#               ELURA UTILITY • MEMBER RATE TESTS
+# ============================================================
+#   python -m pytest -q tests
+
+import main
+
+
+def test_quiet_guilds_are_forgotten(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: now[0])
+    detector = main.MemberRateDetector(window=10)
+
+    detector.record(1)
+    detector.record(1)
+    detector.record(2, "leave")
+    assert detector.rate(1) == 2 and detector.rate(2, "leave") == 1
+
+    now[0] += 10
+    assert detector.rate(1) == 0
+    assert (1, "join") not in detector._events     # emptied by the query itself
+
+    detector.record(3)                              # sweeps the guild nobody asked about
+    assert list(detector._events) == [(3, "join")]
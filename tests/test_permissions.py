@@ -0,0 +1,12 @@
+# ============================================================
+#               ELURA UTILITY • PERMISSION TESTS
+# ============================================================
+#   python -m pytest -q tests
+
+import main
+
+
+def test_invalid_role_ids_are_skipped():
+    config = main.GuildConfig(5, {"founder_role": "founder?", "punishment_roles": {"tier1": ["oops", None, "12"], "tier4": ["34"]}})
+    assert config.permissions.roles == {12, 34}
+    assert config.permissions.ranks == {12: 0, 34: 3}
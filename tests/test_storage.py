@@ -0,0 +1,210 @@
+# ============================================================
+#                 ELURA UTILITY • STORAGE TESTS
+# ============================================================
+#   python -m pytest -q tests
+
+import os
+import sqlite3
+
+import pytest
+
+import main
+
+
+def reopen(json_path):
+    """A second storage on the same files, as the next process start would see them."""
+    return main.AllianceStorage(json_path).load()
+
+
+def test_log_replays_every_operation(tmp_path):
+    json_path = str(tmp_path / "alliances.json")
+    storage = main.AllianceStorage(json_path)
+    state = storage.load()
+    state.update({"guild_settings": {"a": 1, "b": 2}, "punishments": {"cases": []}})
+    storage.set(state, ("guild_settings",), ("punishments",))
+    storage.write([{"op": "del", "path": ["guild_settings", "b"]}])
+    storage.append(("punishments", "cases"), {"case": "A"})
+    storage.append(("punishments", "cases"), {"case": "B"})
+    storage.remove(("punishments", "cases"), "case", "A")
+    storage.join()
+
+    assert not os.path.exists(json_path)  # nothing but the log so far
+    assert reopen(json_path) == {"guild_settings": {"a": 1}, "punishments": {"cases": [{"case": "B"}]}}
+
+
+def test_torn_final_log_line_is_ignored(tmp_path):
+    json_path = str(tmp_path / "alliances.json")
+    with open(json_path + ".wal", "w") as f:
+        f.write('{"op": "set", "path": ["bot"], "value": {"token": "x"}}\n')
+        f.write('{"op": "set", "path": ["other"], "val')
+
+    assert reopen(json_path) == {"bot": {"token": "x"}}
+
+
+def test_compaction_folds_the_log_into_the_snapshot(tmp_path):
+    json_path = str(tmp_path / "alliances.json")
+    storage = main.AllianceStorage(json_path, compact_records=3)
+    storage.load()
+    for n in range(5):
+        storage.write([{"op": "set", "path": ["counter"], "value": n}])
+    storage.join()
+    storage._compactor.join()
+
+    assert main.read_json_generations(json_path)["counter"] == 2
+    assert not os.path.exists(json_path + ".wal.compacting")
+    assert reopen(json_path) == {"counter": 4}
+
+
+def test_migrate_includes_log_only_guild_shards(tmp_path):
+    json_path = str(tmp_path / "data" / "alliances.json")
+    source = main.AllianceStorage(json_path)
+    source.load()
+    source.write([
+        {"op": "set", "path": [str(guild_id), str(user_id)], "value": {"wallet": user_id, "bank": guild_id}}
+        for guild_id in range(100, 105) for user_id in range(3)
+    ])
+    source.join()
+
+    # Fresh guilds have only a log until it compacts
+    assert not any(name.endswith(".json") for name in os.listdir(tmp_path / "data" / "guilds"))
+    assert source.guild_ids() == ["100", "101", "102", "103", "104"]
+
+    db_path = str(tmp_path / "alliances.db")
+    main.migrate_to_sqlite(json_path, db_path)
+    rows = sqlite3.connect(db_path).execute("SELECT guild_id, COUNT(*), SUM(wallet) FROM economy GROUP BY guild_id").fetchall()
+    assert rows == [(guild_id, 3, 3) for guild_id in range(100, 105)]
+
+
+def test_sharded_checkpoint_keeps_other_workers_rows(tmp_path):
+    db_path = str(tmp_path / "alliances.db")
+    mine, theirs = 1 << 22, 2 << 22       # shards 1 and 0 of 2
+    seed = main.SQLiteStorage(db_path)
+    seed.load()
+    seed.write([
+        {"op": "append", "path": ["punishments", "cases"], "value": {"case": str(n), "guild_id": str(guild_id), "user": "7"}}
+        for n, guild_id in enumerate((mine, theirs))
+    ] + [
+        {"op": "set", "path": ["counting", str(guild_id)], "value": {"current": 5, "last_user": None}}
+        for guild_id in (mine, theirs)
+    ])
+    seed.join()
+
+    worker = main.SQLiteStorage(db_path, lambda guild_id: main.shard_for_guild(guild_id, 2) == 1)
+    state = worker.load()
+    assert [case["case"] for case in state["punishments"]["cases"]] == ["0"]
+    state["punishments"]["cases"] = []
+    state["counting"] = {}
+    worker.checkpoint(state)
+    worker.join()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT case_id FROM cases").fetchall() == [("1",)]
+    assert conn.execute("SELECT guild_id FROM counting").fetchall() == [(theirs,)]
+
+
+def test_workers_allocate_distinct_case_numbers(tmp_path):
+    db_path = str(tmp_path / "alliances.db")
+    workers = [main.SQLiteStorage(db_path, lambda guild_id, k=k: main.shard_for_guild(guild_id, 2) == k) for k in range(2)]
+    for worker in workers:
+        worker.load()
+
+    async def allocate_all():
+        return [await worker.allocate(main.LAST_CASE_PATH, n) for n in (1, 3) for worker in workers]
+
+    assert main.asyncio.run(allocate_all()) == [1, 2, 5, 8]
+    assert workers[0].state["punishments"]["last_case_id"] == 5
+
+
+def test_json_allocate_replays_from_log(tmp_path):
+    json_path = str(tmp_path / "alliances.json")
+    source = main.AllianceStorage(json_path)
+    source.load()
+    assert main.asyncio.run(source.allocate(main.LAST_CASE_PATH, 2)) == 2
+    source.join()
+    state = {}
+    for record in main.read_log(json_path + ".wal"):
+        main.apply_record(state, record)
+    assert state == {"punishments": {"last_case_id": 2}}
+
+
+def test_sqlite_root_set_inside_batch(tmp_path):
+    db_path = str(tmp_path / "alliances.db")
+    storage = main.SQLiteStorage(db_path)
+    storage.load()
+    storage.write([
+        {"op": "set", "path": ["bot"], "value": {"token": "old"}},
+        {"op": "set", "path": [], "value": {"bot": {"token": "new"}, "guild_settings": {}}},
+    ])
+    storage.join()
+
+    rows = sqlite3.connect(db_path).execute("SELECT key, value FROM documents ORDER BY key").fetchall()
+    assert rows == [("bot", '{"token": "new"}'), ("guild_settings", "{}")]
+
+
+def test_guild_cache_reads_a_guild_once_off_the_loop():
+    main.storage.shards.write("777", {"1": {"wallet": 5, "bank": 0}})
+    main.storage.join()
+    loads = main.guild_cache.loads
+
+    async def load_concurrently():
+        loop_thread = main.threading.get_ident()
+        read = main.guild_cache._read
+        threads = []
+        main.guild_cache._read = lambda key: (threads.append(main.threading.get_ident()), read(key))[1]
+        try:
+            tables = await main.asyncio.gather(*(main.load_guild_accounts(777) for _ in range(5)))
+        finally:
+            del main.guild_cache._read
+        return tables, threads, loop_thread
+
+    tables, threads, loop_thread = main.asyncio.run(load_concurrently())
+    assert all(table is tables[0] for table in tables)
+    assert main.guild_cache.loads == loads + 1
+    assert len(threads) == 1 and threads[0] != loop_thread
+    assert main.get_user_data(777, 1)["wallet"] == 5
+
+
+def test_compacted_segment_is_not_replayed_after_a_crash(tmp_path, monkeypatch):
+    json_path = str(tmp_path / "alliances.json")
+    main.atomic_write_json(json_path, {"punishments": {"cases": [], "last_case_id": 1}})
+    with open(json_path + ".wal.compacting", "w") as f:
+        for record in (
+            {"op": "append", "path": ["punishments", "cases"], "value": {"case": "A"}},
+            {"op": "incr", "path": ["punishments", "last_case_id"], "value": 1},
+        ):
+            f.write(main.json.dumps(record) + "\n")
+
+    # Crash after the snapshot is written, before the segment is removed
+    def crash(path):
+        raise OSError("simulated crash")
+    with monkeypatch.context() as m, pytest.raises(OSError):
+        m.setattr(main.os, "remove", crash)
+        main.AllianceStorage(json_path)._compact_segment()
+    assert os.path.exists(json_path + ".wal.compacting")
+
+    state = main.AllianceStorage(json_path).load()
+    assert state == {"punishments": {"cases": [{"case": "A"}], "last_case_id": 2}}
+    assert not os.path.exists(json_path + ".wal.compacting")
+
+
+def test_snapshots_rotate_generations(tmp_path):
+    path = str(tmp_path / "alliances.json")
+    for version in range(4):
+        main.atomic_write_json(path, {"version": version}, generations=3)
+
+    assert main.read_json_generations(path) == {"version": 3}
+    assert [main.json.load(open(f"{path}.{n}")) for n in (1, 2)] == [{"version": 2}, {"version": 1}]
+    assert not os.path.exists(path + ".3") and not os.path.exists(path + ".tmp")
+
+
+def test_corrupt_snapshot_falls_back_and_is_quarantined(tmp_path):
+    path = str(tmp_path / "alliances.json")
+    main.atomic_write_json(path, {"version": 1})
+    main.atomic_write_json(path, {"version": 2})
+    with open(path, "w") as f:
+        f.write('{"version": ')
+
+    assert main.read_json_generations(path) == {"version": 1}
+    assert open(path + ".corrupt").read() == '{"version": '
+    assert not os.path.exists(path)
+    assert main.read_json_generations(str(tmp_path / "missing.json")) is None